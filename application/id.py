@@ -10,6 +10,7 @@ Date: 15/04/2023
 
 # ----- Basic -----
 keyboard_id = 'keyboard'
+keyboard_release_id = 'keyboard_release'
 page_selection_section_id = 'page_selection_section'
 home_page_link_id = 'home_page_link'
 main_page_link_id = 'main_page_link'
@@ -24,6 +25,8 @@ home_page_id = 'home_page'
 title_id = 'home_page_title'
 configuration_file_upload_id = 'home_page_configuration_file_upload'
 configuration_store_id = 'home_page_configuration_store'
+indexing_progress_label_id = 'home_page_indexing_progress_label'
+indexing_progress_interval_id = 'home_page_indexing_progress_interval'
 invalid_configuration_file_error_modal_id = 'home_page_invalid_configuration_file_error_modal'
 close_invalid_configuration_file_error_modal_button_id = 'home_page_close_invalid_configuration_file_error_modal_button'
 
@@ -0,0 +1,149 @@
+"""Benchmark of tiled resampling.
+
+This module measures how resampling slices in row tiles
+scales from 1 to N threads on synthetic volumes. Run it from
+the repository root directory:
+
+    python -m benchmarks.benchmark_resampler --thread-number 8
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+import argparse
+from concurrent import futures
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from object import record
+from object import resampler
+
+
+GRID_SIZE = 256  # Voxels along each axis of the synthetic volumes
+PLAIN_SIZE = 512  # Pixels along each axis of the slices
+SLICE_NUMBER = 8  # Slices resampled in each batch
+REPEAT_NUMBER = 5  # Timings per thread number, of which the median is taken
+SEED = 0
+
+
+def main() -> int:
+    argument = _parse_argument()
+    initialiser_map = _build_initialiser_map(
+        argument.grid_size, argument.plain_size)
+    plain_affine_stack = _build_plain_affine_stack(
+        argument.grid_size, argument.plain_size, argument.slice_number)
+    print(
+        f'grid: {argument.grid_size}^3, plain: {argument.plain_size}^2, '
+        f'slices: {argument.slice_number}, '
+        f'tile rows: {resampler.TILE_ROW_NUMBER}'
+    )
+    print(f'{"resampler":<10}{"threads":>8}{"median (s)":>12}{"speedup":>9}')
+    for name, initialiser in initialiser_map.items():
+        _benchmark(
+            name,
+            initialiser,
+            plain_affine_stack,
+            argument.thread_number,
+            argument.repeat_number,
+        )
+    return 0
+
+def _parse_argument() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=globals()['__doc__'])
+    parser.add_argument('--thread-number', type=int, default=os.cpu_count())
+    parser.add_argument('--grid-size', type=int, default=GRID_SIZE)
+    parser.add_argument('--plain-size', type=int, default=PLAIN_SIZE)
+    parser.add_argument('--slice-number', type=int, default=SLICE_NUMBER)
+    parser.add_argument('--repeat-number', type=int, default=REPEAT_NUMBER)
+    return parser.parse_args()
+
+def _build_initialiser_map(
+    grid_size: int, plain_size: int,
+) -> dict[type[resampler.ResamplerABC], record.ResamplerInitialiser]:
+    # Body images are smooth int16 volumes, and organ labels are spheres
+    generator = np.random.default_rng(SEED)
+    axis_index = np.arange(grid_size, dtype=np.float32)
+    x, y, z = np.meshgrid(axis_index, axis_index, axis_index, indexing='ij', sparse=True)
+    body_pixel_data = (
+        1000 * np.sin(x / 17) * np.cos(y / 23) + 10 * z
+        + generator.normal(0, 20, (grid_size,)*3)
+    ).astype(np.int16)
+    centre = (grid_size - 1) / 2
+    organ_pixel_data = (
+        (x-centre)**2 + (y-centre)**2 + (z-centre)**2 <= (grid_size/3)**2
+    ).astype(np.uint8)
+    return {
+        resampler.Body3DResampler: record.ResamplerInitialiser(
+            plain_size = (plain_size, plain_size),
+            grid_pixel_data = body_pixel_data,
+            grid_affine = np.eye(4),
+        ),
+        resampler.Organ3DResampler: record.ResamplerInitialiser(
+            plain_size = (plain_size, plain_size),
+            grid_pixel_data = organ_pixel_data,
+            grid_affine = np.eye(4),
+        ),
+    }
+
+def _build_plain_affine_stack(
+    grid_size: int, plain_size: int, slice_number: int) -> np.ndarray:
+    # Oblique slices through the centre, scaled so that each slice spans
+    # the volume
+    generator = np.random.default_rng(SEED)
+    plain_affine_stack = np.zeros((slice_number, 4, 4))
+    for plain_affine, angle_pair in zip(
+        plain_affine_stack, generator.uniform(-0.5, 0.5, (slice_number, 2))):
+        rotation = _build_rotation(*angle_pair)
+        scale = grid_size / plain_size
+        plain_affine[:3, :3] = rotation * scale
+        plain_affine[:3, 3] = (grid_size-1) / 2 - rotation[:, :2] @ (
+            np.full(2, (plain_size-1) / 2) * scale)
+        plain_affine[3, 3] = 1
+    return plain_affine_stack
+
+def _build_rotation(angle_x: float, angle_y: float) -> np.ndarray:
+    cos_x, sin_x = np.cos(angle_x), np.sin(angle_x)
+    cos_y, sin_y = np.cos(angle_y), np.sin(angle_y)
+    rotation_x = np.array(((1, 0, 0), (0, cos_x, -sin_x), (0, sin_x, cos_x)))
+    rotation_y = np.array(((cos_y, 0, sin_y), (0, 1, 0), (-sin_y, 0, cos_y)))
+    return rotation_y @ rotation_x
+
+def _benchmark(
+    resampler_type: type[resampler.ResamplerABC],
+    initialiser: record.ResamplerInitialiser,
+    plain_affine_stack: np.ndarray,
+    thread_number_max: int,
+    repeat_number: int,
+) -> None:
+    # Outputs of every thread number are checked against the untiled output
+    pixel_data_stack_expected = resampler_type(initialiser).resample_batch(
+        plain_affine_stack)
+    time_base = None
+    for thread_number in range(1, thread_number_max+1):
+        with futures.ThreadPoolExecutor(thread_number) as thread_pool:
+            resampler_tiled = resampler_type(
+                initialiser, thread_pool if thread_number > 1 else None)
+            time_sequence = []
+            for _ in range(repeat_number):
+                time_start = time.perf_counter()
+                pixel_data_stack = resampler_tiled.resample_batch(
+                    plain_affine_stack)
+                time_sequence.append(time.perf_counter() - time_start)
+        if not np.array_equal(pixel_data_stack, pixel_data_stack_expected):
+            raise RuntimeError(
+                f'Tiled output differs with {thread_number} threads')
+        time_median = statistics.median(time_sequence)
+        time_base = time_median if time_base is None else time_base
+        print(
+            f'{resampler_type.__name__.removesuffix("3DResampler"):<10}'
+            f'{thread_number:>8}{time_median:>12.4f}'
+            f'{time_base / time_median:>8.2f}x'
+        )
+
+
+if __name__ == '__main__':
+    sys.exit(main())
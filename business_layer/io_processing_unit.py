@@ -3,39 +3,188 @@
 This module contains the implementation of IO Processing
 Unit used in the application. It is a sub-component of
 AppFactory, which can handle all IO-related operations.
+Files are written on a thread pool, and can be written
+behind so that saving does not block users.
 
 Created by: Weixun Luo
 Date: 06/05/2023
 """
 from __future__ import annotations
+import atexit
+from concurrent import futures
+import functools
+import threading
 import typing
 
 import numpy as np
 import pandas as pd
 
 from object import transformation
+from object import transformation_store
 from utils import io_utils
+from utils import matrix_utils
 
 
-TRANSFORMATION_PARAMETER_COLUMN_SEQUENCE = (
-    'translation_x', 'translation_y', 'translation_z',
-    'rotation_x', 'rotation_y', 'rotation_z',
-    'scale_x', 'scale_y', 'scale_z',
-    'skew_x', 'skew_y', 'skew_z',
-)
+TRANSFORMATION_PARAMETER_COLUMN_SEQUENCE = transformation_store.PARAMETER_COLUMN_SEQUENCE
+
+WRITE_BEHIND = True  # Saving returns before files are written if enabled
+WRITER_THREAD_NUMBER = 4  # Files written concurrently
+ORGAN_RESAMPLED_COMPRESSION_LEVEL = 1  # From 0 (stored) to 9 (smallest) for .nii.gz files
 
 Transformation: typing.TypeAlias = transformation.TransformationABC
+TransformationStore: typing.TypeAlias = transformation_store.TransformationStore
 
 
 class IOProcessingUnit:
     """IO Processing Unit.
 
     A sub-component of AppFactory that can handle all IO-
-    related operations.
+    related operations. Content is queued and written on a
+    thread pool, where writes to the same file never overlap
+    and, when a file is queued again before being written,
+    only its latest content is written. With write-behind
+    enabled, content is snapshotted and saving returns at
+    once. Failures are then kept until they are collected or
+    raised by flushing, and queued writes are flushed when
+    the interpreter exits. Otherwise saving waits for the
+    writes and raises their failures. Failure callbacks are
+    called for each failed write, so that callers can mark
+    its content as unsaved.
+
+    Transformations are upserted into the transformation
+    store instead of spreadsheets when one is given.
+
+    Resampled organs of a case are written with the same data
+    type given for the case, or otherwise the smallest data
+    type holding the values of each slice exactly, at the
+    compression level set up for the dataset.
     """
 
-    def __init__(self) -> None:
-        pass
+    def __init__(
+        self,
+        is_write_behind: bool = WRITE_BEHIND,
+        writer_thread_number: int = WRITER_THREAD_NUMBER,
+        organ_resampled_compression_level: int = ORGAN_RESAMPLED_COMPRESSION_LEVEL,
+    ) -> None:
+        self._is_write_behind = is_write_behind
+        self._organ_resampled_compression_level = organ_resampled_compression_level
+        self._writer = futures.ThreadPoolExecutor(
+            writer_thread_number, thread_name_prefix='writing')
+        self._version_map = {}
+        self._future_map = {}  # Latest write queued for each file
+        self._file_lock_map = {}
+        self._future_list = []
+        self._failure_list = []
+        self._lock = threading.Lock()
+        atexit.register(self.shut_down)
+    
+    def set_up(self, organ_resampled_compression_level: int | None) -> None:
+        """Sets up for a dataset, where None keeps the default level."""
+        if organ_resampled_compression_level is None:
+            organ_resampled_compression_level = ORGAN_RESAMPLED_COMPRESSION_LEVEL
+        if not 0 <= organ_resampled_compression_level <= 9:
+            raise ValueError(
+                f'Unsupported compression level: {organ_resampled_compression_level}')
+        self._organ_resampled_compression_level = organ_resampled_compression_level
+    
+    def flush(self) -> None:
+        """Waits for all queued writes and raises the first failure."""
+        with self._lock:
+            future_sequence = tuple(self._future_list)
+            self._future_list = []
+        futures.wait(future_sequence)
+        failure_sequence = self.collect_failure()
+        if len(failure_sequence) != 0:
+            raise failure_sequence[0]
+    
+    def wait(self, file_path_sequence: typing.Iterable[str]) -> None:
+        """Waits for queued writes to the given files.
+
+        Files are read only after waiting, so that content still
+        being saved is never read back stale. Failures are left
+        to be collected or raised by flushing.
+        """
+        with self._lock:
+            future_sequence = tuple(
+                self._future_map[file_path]
+                for file_path in file_path_sequence
+                if file_path in self._future_map
+            )
+        # Earlier writes of the same files are superseded or done by then
+        futures.wait(future_sequence)
+    
+    def collect_failure(self) -> tuple[Exception, ...]:
+        """Returns and forgets failures of writes done so far."""
+        with self._lock:
+            failure_sequence = tuple(self._failure_list)
+            self._failure_list = []
+        return failure_sequence
+    
+    def shut_down(self) -> None:
+        self._writer.shutdown(wait=True)
+    
+    def _write(
+        self,
+        writer: typing.Callable[..., None],
+        content_sequence: tuple,
+        file_path: str,
+        on_written: typing.Callable[[], None] | None = None,
+        on_failed: typing.Callable[[], None] | None = None,
+    ) -> None:
+        with self._lock:
+            version = self._version_map.get(file_path, 0) + 1
+            self._version_map[file_path] = version
+            self._file_lock_map.setdefault(file_path, threading.Lock())
+            self._future_list = [
+                future for future in self._future_list if not future.done()]
+            future = self._writer.submit(
+                self._write_latest,
+                writer,
+                content_sequence,
+                file_path,
+                version,
+                on_written,
+                on_failed,
+            )
+            self._future_list.append(future)
+            self._future_map[file_path] = future
+    
+    def _write_latest(
+        self,
+        writer: typing.Callable[..., None],
+        content_sequence: tuple,
+        file_path: str,
+        version: int,
+        on_written: typing.Callable[[], None] | None,
+        on_failed: typing.Callable[[], None] | None,
+    ) -> None:
+        # Versions are checked while holding the lock of the file, so that
+        # older content is never written after newer content
+        with self._file_lock_map[file_path]:
+            with self._lock:
+                if self._version_map[file_path] != version:
+                    return  # Superseded by content queued later
+            try:
+                writer(*content_sequence, file_path)
+                if on_written is not None:
+                    on_written()
+            except Exception as exception:
+                if on_failed is not None:
+                    on_failed()
+                with self._lock:
+                    self._failure_list.append(exception)
+    
+    def _wait(self) -> None:
+        if not self._is_write_behind:
+            self.flush()
+    
+    def _snapshot(self, pixel_data: np.ndarray) -> np.ndarray:
+        # Read-only arrays are never modified in place and can be shared
+        if not self._is_write_behind or (
+            isinstance(pixel_data, np.ndarray) and not pixel_data.flags.writeable):
+            return pixel_data
+        else:
+            return np.array(pixel_data)
     
     def write_transformation_spreadsheet(
         self,
@@ -43,15 +192,34 @@ class IOProcessingUnit:
         slice_id_sequence: tuple[str, ...],
         transformation_parameter_matrix: np.ndarray,
         file_path: str,
+        is_dirty: bool = True,
+        on_written: typing.Callable[[], None] | None = None,
+        on_failed: typing.Callable[[], None] | None = None,
+        transformation_store: TransformationStore | None = None,
     ) -> None:
-        io_utils.write_file(
-            self._build_transformation_spreadsheet_content(
-                case_id,
-                slice_id_sequence,
-                transformation_parameter_matrix,
+        if not is_dirty:
+            return
+        if transformation_store is None:
+            writer = io_utils.write_file
+        else:
+            # Writes are still keyed by the spreadsheet file path, so that
+            # cases are written in parallel while writes of a case never overlap
+            writer = functools.partial(
+                self._write_transformation_store, transformation_store)
+        self._write(
+            writer,
+            (
+                self._build_transformation_spreadsheet_content(
+                    case_id,
+                    slice_id_sequence,
+                    transformation_parameter_matrix,
+                ),
             ),
             file_path,
+            on_written,
+            on_failed,
         )
+        self._wait()
     
     def _build_transformation_spreadsheet_content(
         self,
@@ -71,15 +239,54 @@ class IOProcessingUnit:
             }
         )
     
+    def _write_transformation_store(
+        self,
+        transformation_store: TransformationStore,
+        content: pd.DataFrame,
+        _: str,
+    ) -> None:
+        transformation_store.upsert(content)
+    
     def write_organ_resampled_map(
         self,
         pixel_data_map: dict[str, str],
         affine_map: dict[str, str],
         file_path_map: dict[str, str],
+        on_failed: typing.Callable[[str], None] | None = None,
+        data_type: type | None = None,
     ) -> None:
+        # The compression level is bound when queued, so that writes left
+        # from a dataset are not affected by setting up the next one
+        writer = functools.partial(
+            self._write_organ_resampled,
+            data_type,
+            self._organ_resampled_compression_level,
+        )
         for slice_id in file_path_map:
-            io_utils.write_image(
-                pixel_data_map[slice_id],
-                affine_map[slice_id],
+            self._write(
+                writer,
+                (
+                    self._snapshot(pixel_data_map[slice_id]),
+                    self._snapshot(affine_map[slice_id]),
+                ),
                 file_path_map[slice_id],
-            )
\ No newline at end of file
+                on_failed = (
+                    None if on_failed is None
+                    else functools.partial(on_failed, slice_id)
+                ),
+            )
+        self._wait()
+    
+    def _write_organ_resampled(
+        self,
+        data_type: type | None,
+        compression_level: int,
+        pixel_data: np.ndarray,
+        affine: np.ndarray,
+        file_path: str,
+    ) -> None:
+        if data_type is None:
+            pixel_data = matrix_utils.cast_compact(pixel_data)
+        else:
+            pixel_data = matrix_utils.cast(pixel_data, data_type)
+        io_utils.write_image(pixel_data, affine, file_path, compression_level)
@@ -9,14 +9,33 @@ Created by: Weixun Luo
 Date: 10/04/2023
 """
 from __future__ import annotations
+import atexit
+from concurrent import futures
+import multiprocessing
+from multiprocessing import shared_memory
 import typing
 
 import numpy as np
 
+from object import cache
 from object import record
 from object import resampler
+from utils import matrix_utils
+from utils import shared_memory_utils
 
 
+CACHE_BYTE_BUDGET = 256 * 2**20
+CACHE_AFFINE_QUANTUM = 1e-4  # Affines closer than this are deemed identical
+ROI_RESAMPLING = False  # Body images are only resampled within slice masks
+PREVIEW_STRIDE = 4  # Previews sample every PREVIEW_STRIDE pixels along each axis
+THREAD_NUMBER = 1  # Slices are resampled in row tiles on a thread pool if above 1
+PROCESS_NUMBER = 1  # Slice batches are resampled on a process pool if above 1
+PROCESS_START_METHOD = (  # Workers never inherit locks held by other threads
+    'forkserver'
+    if 'forkserver' in multiprocessing.get_all_start_methods()
+    else 'spawn'
+)
+
 Initialiser: typing.TypeAlias = record.ResamplingProcessingUnitInitialiser
 
 
@@ -25,29 +44,427 @@ class ResamplingProcessingUnit:
     
     A sub-component of AppFactory, which can handle all
     operations related to the resampling of body images and
-    organ labels.
+    organ labels. Resampled body images and organ labels are
+    cached by slice ID and transformation, so returning to a
+    previous pose does not require resampling. In ROI mode,
+    body images are only resampled within the slice mask,
+    while organ labels always cover the whole slice. Previews
+    are resampled at a coarser stride and upscaled, which
+    keeps interaction responsive on large slices. Body images
+    and organ labels share one thread pool for tiled
+    resampling. Batches of slices can instead be resampled
+    on a process pool, where volumes are published once per
+    case in shared memory and only affines are sent to the
+    workers.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        cache_byte_budget: int = CACHE_BYTE_BUDGET,
+        roi_resampling: bool = ROI_RESAMPLING,
+        preview_stride: int = PREVIEW_STRIDE,
+        thread_number: int = THREAD_NUMBER,
+        process_number: int = PROCESS_NUMBER,
+    ) -> None:
+        self._cache_byte_budget = cache_byte_budget
+        self._roi_resampling = roi_resampling
+        self._preview_stride = preview_stride
+        self._thread_pool = self._construct_thread_pool(thread_number)
+        self._process_number = process_number
         self._body_resampler = None
         self._organ_resampler = None
+        self._cache = None
+        self._shared_memory_map = {}
+        self._process_pool = None
+        if self._process_number > 1:
+            atexit.register(self.shut_down)
+    
+    def _construct_thread_pool(
+        self, thread_number: int) -> futures.ThreadPoolExecutor | None:
+        if thread_number > 1:
+            return futures.ThreadPoolExecutor(
+                thread_number, thread_name_prefix='resampling')
+        else:
+            return None
+    
+    @property
+    def is_roi_resampling(self) -> bool:
+        return self._get_is_roi_resampling_by_property()
+    
+    def _get_is_roi_resampling_by_property(self) -> bool:
+        return self._roi_resampling
+    
+    @property
+    def is_initialiser_required(self) -> bool:
+        return self._get_is_initialiser_required_by_property()
     
-    def set_up(self, initialiser: Initialiser) -> None:
-        self._body_resampler = self._construct_body_resampler(initialiser)
-        self._organ_resampler = self._construct_organ_resampler(initialiser)
+    def _get_is_initialiser_required_by_property(self) -> bool:
+        # Given a state, volumes are only needed to publish them to workers
+        return self._process_number > 1
+    
+    def set_up(
+        self,
+        initialiser: Initialiser | None,
+        state: record.ResamplingState | None = None,
+    ) -> None:
+        """Sets up for a case, reusing the state built for it if given.
+
+        The initialiser can be None if a state is given, unless
+        an initialiser is required to set up the process pool.
+        """
+        self.shut_down()
+        if state is None:
+            state = self._build_state(initialiser)
+        self._body_resampler = state['body_resampler']
+        self._organ_resampler = state['organ_resampler']
+        self._cache = state['cache']
+        self._shared_memory_map = self._construct_shared_memory_map(initialiser)
+        self._process_pool = self._construct_process_pool(initialiser)
+    
+    def _build_state(self, initialiser: Initialiser) -> record.ResamplingState:
+        return record.ResamplingState(
+            body_resampler = self._construct_body_resampler(initialiser),
+            organ_resampler = self._construct_organ_resampler(initialiser),
+            cache = self._construct_cache(),
+        )
     
     def _construct_body_resampler(
         self, initialiser: Initialiser) -> resampler.Body3DResampler:
         return resampler.Body3DResampler(
-            initialiser['body_resampler_initialiser'])
+            initialiser['body_resampler_initialiser'], self._thread_pool)
         
     def _construct_organ_resampler(
         self, initialiser: Initialiser) -> resampler.Organ3DResampler:
         return resampler.Organ3DResampler(
-            initialiser['organ_resampler_initialiser'])
+            initialiser['organ_resampler_initialiser'], self._thread_pool)
+    
+    def _construct_cache(self) -> cache.LRUCache:
+        return cache.LRUCache(self._cache_byte_budget)
+    
+    def _construct_shared_memory_map(
+        self, initialiser: Initialiser,
+    ) -> dict[str, tuple[shared_memory.SharedMemory, record.SharedArray]]:
+        if self._process_number > 1:
+            return {
+                name: shared_memory_utils.publish(
+                    initialiser[name]['grid_pixel_data'])
+                for name
+                in ('body_resampler_initialiser', 'organ_resampler_initialiser')
+            }
+        else:
+            return {}
+    
+    def _construct_process_pool(
+        self, initialiser: Initialiser) -> futures.ProcessPoolExecutor | None:
+        if self._process_number > 1:
+            return futures.ProcessPoolExecutor(
+                self._process_number,
+                mp_context = multiprocessing.get_context(PROCESS_START_METHOD),
+                initializer = _initialise_worker,
+                initargs = (
+                    self._build_shared_initialiser(initialiser),
+                    self._roi_resampling,
+                ),
+            )
+        else:
+            return None
+    
+    def _build_shared_initialiser(self, initialiser: Initialiser) -> dict:
+        # Same as the initialiser, except that pixel data is replaced by the
+        # shared arrays workers can attach to
+        return {
+            name: {
+                **resampler_initialiser,
+                'grid_pixel_data': self._shared_memory_map[name][1],
+            }
+            for name, resampler_initialiser in initialiser.items()
+        }
+    
+    def shut_down(self) -> None:
+        if self._process_pool is not None:
+            self._process_pool.shutdown(cancel_futures=True)
+            self._process_pool = None
+        for memory, _ in self._shared_memory_map.values():
+            shared_memory_utils.release(memory, is_owner=True)
+        self._shared_memory_map = {}
+    
+    def resample(
+        self,
+        slice_id: str,
+        plain_affine: np.ndarray,
+        plain_roi: np.ndarray | None,
+        is_preview: bool = False,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Slice masks never change, so the slice ID also identifies the ROI.
+        # ROIs are only required in ROI mode
+        stride = self._select_stride(is_preview)
+        key = self._build_cache_key(slice_id, plain_affine, stride)
+        output = self._cache.get(key)
+        if output is None:
+            output = self._resample(plain_affine, plain_roi, stride)
+            self._cache.put(key, output, sum(_.nbytes for _ in output))
+        return output
+    
+    def _select_stride(self, is_preview: bool) -> int:
+        return self._preview_stride if is_preview else 1
+    
+    def _build_cache_key(
+        self, slice_id: str, plain_affine: np.ndarray, stride: int,
+    ) -> tuple[str, bytes, int]:
+        plain_affine_quantised = np.round(plain_affine / CACHE_AFFINE_QUANTUM)
+        plain_affine_quantised = plain_affine_quantised.astype(np.int64)
+        return slice_id, plain_affine_quantised.tobytes(), stride
+    
+    def _resample(
+        self,
+        plain_affine: np.ndarray,
+        plain_roi: np.ndarray | None,
+        stride: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        return self._resample_batch(
+            plain_affine[np.newaxis],
+            None if plain_roi is None else plain_roi[np.newaxis],
+            stride,
+        )[0]
     
-    def resample_body(self, plain_affine: np.ndarray) -> np.ndarray:
-        return self._body_resampler.resample(plain_affine)
+    def resample_batch(
+        self,
+        slice_id_sequence: tuple[str, ...],
+        plain_affine_stack: np.ndarray,
+        plain_roi_stack: np.ndarray | None,
+        is_preview: bool = False,
+    ) -> tuple[tuple[np.ndarray, np.ndarray], ...]:
+        stride = self._select_stride(is_preview)
+        key_sequence = tuple(
+            self._build_cache_key(slice_id, plain_affine, stride)
+            for slice_id, plain_affine
+            in zip(slice_id_sequence, plain_affine_stack)
+        )
+        output_sequence = [self._cache.get(key) for key in key_sequence]
+        miss_index_sequence = [
+            i for i, output in enumerate(output_sequence) if output is None]
+        if len(miss_index_sequence) != 0:
+            output_miss_sequence = self._resample_batch(
+                plain_affine_stack[miss_index_sequence],
+                None if plain_roi_stack is None
+                else plain_roi_stack[miss_index_sequence],
+                stride,
+            )
+            for i, output in zip(miss_index_sequence, output_miss_sequence):
+                self._cache.put(
+                    key_sequence[i], output, sum(_.nbytes for _ in output))
+                output_sequence[i] = output
+        return tuple(output_sequence)
     
-    def resample_organ(self, plain_affine: np.ndarray) -> np.ndarray:
-        return self._organ_resampler.resample(plain_affine)
\ No newline at end of file
+    def _resample_batch(
+        self,
+        plain_affine_stack: np.ndarray,
+        plain_roi_stack: np.ndarray | None,
+        stride: int,
+    ) -> tuple[tuple[np.ndarray, np.ndarray], ...]:
+        if self._process_pool is not None and len(plain_affine_stack) > 1:
+            body_resampled_stack, organ_resampled_stack = self._resample_batch_by_process(
+                plain_affine_stack, plain_roi_stack, stride)
+        else:
+            body_resampled_stack = self._body_resampler.build_plain_pixel_data_stack(
+                len(plain_affine_stack), stride)
+            organ_resampled_stack = self._organ_resampler.build_plain_pixel_data_stack(
+                len(plain_affine_stack), stride)
+            self._resample_batch_by_tile(
+                plain_affine_stack,
+                plain_roi_stack,
+                stride,
+                body_resampled_stack,
+                organ_resampled_stack,
+            )
+        body_resampled_stack = self._body_resampler.upscale(
+            body_resampled_stack, stride)
+        organ_resampled_stack = self._organ_resampler.upscale(
+            organ_resampled_stack, stride)
+        for pixel_data_stack in (body_resampled_stack, organ_resampled_stack):
+            pixel_data_stack.setflags(write=False)  # Cached arrays are shared
+        return tuple(zip(body_resampled_stack, organ_resampled_stack))
+    
+    def _resample_batch_by_process(
+        self,
+        plain_affine_stack: np.ndarray,
+        plain_roi_stack: np.ndarray | None,
+        stride: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Each slice is a job writing into output stacks in shared memory,
+        # which are copied out before being released
+        memory_pair, shared_array_pair = zip(*(
+            shared_memory_utils.allocate(
+                (len(plain_affine_stack), *self._organ_resampler.build_plain_size(stride)),
+                matrix_utils.PRECISION,
+            )
+            for _ in range(2)
+        ))
+        try:
+            for future in tuple(
+                self._process_pool.submit(
+                    _resample_in_worker,
+                    shared_array_pair,
+                    i,
+                    plain_affine,
+                    plain_roi_stack[i] if self._roi_resampling else None,
+                    stride,
+                )
+                for i, plain_affine in enumerate(plain_affine_stack)
+            ):
+                future.result()
+            return tuple(
+                np.array(shared_memory_utils.build_array(memory, shared_array))
+                for memory, shared_array in zip(memory_pair, shared_array_pair)
+            )
+        finally:
+            for memory in memory_pair:
+                shared_memory_utils.release(memory, is_owner=True)
+    
+    def _resample_batch_by_tile(
+        self,
+        plain_affine_stack: np.ndarray,
+        plain_roi_stack: np.ndarray | None,
+        stride: int,
+        body_resampled_stack: np.ndarray,
+        organ_resampled_stack: np.ndarray,
+    ) -> None:
+        def resample_tile(row_range: tuple[int, int]) -> None:
+            organ_weight = self._organ_resampler.build_weight(
+                plain_affine_stack, stride=stride, row_range=row_range)
+            body_weight = self._build_body_weight(
+                organ_weight, plain_affine_stack, plain_roi_stack)
+            self._body_resampler.resample_by_weight(
+                body_weight, body_resampled_stack)
+            self._organ_resampler.resample_by_weight(
+                organ_weight, organ_resampled_stack)
+        
+        self._organ_resampler.map_tile(resample_tile, stride)
+    
+    def _build_body_weight(
+        self,
+        organ_weight: record.ResamplingWeight,
+        plain_affine_stack: np.ndarray,
+        plain_roi_stack: np.ndarray | None,
+    ) -> record.ResamplingWeight:
+        # Body images and organ labels usually share the same grid, where the
+        # coordinates (and weights for the same method) can be reused
+        if not self._roi_resampling:
+            plain_roi_stack = None
+        if self._organ_resampler.is_geometry_shared(self._body_resampler):
+            return self._body_resampler.adapt_weight(
+                organ_weight, plain_roi_stack)
+        else:
+            return self._body_resampler.build_weight(
+                plain_affine_stack,
+                plain_roi_stack,
+                organ_weight['stride'],
+                organ_weight['row_range'],
+            )
+    
+    def resample_body_batch(
+        self,
+        plain_affine_stack: np.ndarray,
+        plain_roi_stack: np.ndarray | None = None,
+        is_preview: bool = False,
+    ) -> np.ndarray:
+        return np.stack(tuple(
+            body_resampled
+            for body_resampled, _ in self._resample_batch(
+                plain_affine_stack,
+                plain_roi_stack,
+                self._select_stride(is_preview),
+            )
+        ))
+    
+    def resample_organ_batch(
+        self,
+        plain_affine_stack: np.ndarray,
+        plain_roi_stack: np.ndarray | None = None,
+        is_preview: bool = False,
+    ) -> np.ndarray:
+        return np.stack(tuple(
+            organ_resampled
+            for _, organ_resampled in self._resample_batch(
+                plain_affine_stack,
+                plain_roi_stack,
+                self._select_stride(is_preview),
+            )
+        ))
+    
+    @property
+    def organ_resampled_data_type(self) -> type:
+        return self._get_organ_resampled_data_type_by_property()
+    
+    def _get_organ_resampled_data_type_by_property(self) -> type:
+        return self._organ_resampler.resampled_data_type
+    
+    @property
+    def cache_statistics(self) -> record.CacheStatistics:
+        return self._get_cache_statistics_by_property()
+    
+    def _get_cache_statistics_by_property(self) -> record.CacheStatistics:
+        return self._cache.statistics
+    
+    @property
+    def state(self) -> record.ResamplingState:
+        return self._get_state_by_property()
+    
+    def _get_state_by_property(self) -> record.ResamplingState:
+        return record.ResamplingState(
+            body_resampler = self._body_resampler,
+            organ_resampler = self._organ_resampler,
+            cache = self._cache,
+        )
+
+
+# ----- Process Pool Worker -----
+_worker_memory_sequence = ()
+_worker_processing_unit = None
+
+
+def _initialise_worker(shared_initialiser: dict, roi_resampling: bool) -> None:
+    global _worker_memory_sequence, _worker_processing_unit
+    initialiser = {}
+    memory_sequence = []
+    for name, resampler_initialiser in shared_initialiser.items():
+        memory, grid_pixel_data = shared_memory_utils.attach(
+            resampler_initialiser['grid_pixel_data'])
+        memory_sequence.append(memory)  # Memories are kept open with the worker
+        initialiser[name] = {
+            **resampler_initialiser, 'grid_pixel_data': grid_pixel_data}
+    _worker_memory_sequence = tuple(memory_sequence)
+    # Workers resample on their own, and never publish volumes or start pools
+    _worker_processing_unit = ResamplingProcessingUnit(
+        cache_byte_budget = 0,
+        roi_resampling = roi_resampling,
+        thread_number = 1,
+        process_number = 1,
+    )
+    _worker_processing_unit.set_up(initialiser)
+
+def _resample_in_worker(
+    shared_array_pair: tuple[record.SharedArray, record.SharedArray],
+    index: int,
+    plain_affine: np.ndarray,
+    plain_roi: np.ndarray | None,
+    stride: int,
+) -> None:
+    memory_pair, pixel_data_stack_pair = zip(*(
+        shared_memory_utils.attach(shared_array)
+        for shared_array in shared_array_pair
+    ))
+    try:
+        _worker_processing_unit._resample_batch_by_tile(
+            plain_affine[np.newaxis],
+            None if plain_roi is None else plain_roi[np.newaxis],
+            stride,
+            *(
+                pixel_data_stack[index:index+1]
+                for pixel_data_stack in pixel_data_stack_pair
+            ),
+        )
+    finally:
+        del pixel_data_stack_pair
+        for memory in memory_pair:
+            shared_memory_utils.release(memory, is_owner=False)
@@ -3,17 +3,36 @@
 This module contains the implementation of Dataset used in
 the application. It is based on a spreadsheet that contains
 corresponding paths of all data and offers convenient case
-management through case ID.
+management through case ID. Cases are indexed in the
+background after the first one is found, cases next to the
+current one can be loaded in the background ahead of time,
+and recently visited cases are kept in memory.
 
 Created by: Weixun Luo
 Date: 08/04/2023
 """
 from __future__ import annotations
+import os
+import threading
+import typing
 
 import pandas as pd
 
+from object import cache
+from object import prefetcher
 from object import record
 from object import spreadsheet_builder
+from utils import io_utils
+
+
+MANIFEST_FILE_NAME = '.dataset_manifest.json'  # Saved in the dataset directory
+PREFETCH_DEPTH = 1  # Cases prefetched on each side of the current case
+CASE_CACHE_BYTE_BUDGET = 2 * 2**30
+
+CaseLoader: typing.TypeAlias = typing.Callable[
+    [record.DataAccessorInitialiser], typing.Any]
+CaseSizer: typing.TypeAlias = typing.Callable[[typing.Any], int]
+CaseCloser: typing.TypeAlias = typing.Callable[[typing.Any], None]
 
 
 class Dataset:
@@ -21,34 +40,248 @@ class Dataset:
     
     An object used in the application, which contains all
     paths of data and offers convenient case management
-    through case ID.
+    through case ID. Given a case loader, cases within the
+    prefetch depth of the current case are loaded on a
+    background worker while users work on the current case.
+    Cases left behind are kept in a cache within the byte
+    budget measured by the case sizer, so returning to them
+    does not load them again. Cases evicted from the cache,
+    prefetched but no longer wanted, or dropped when the
+    dataset is started up again, are passed to the case
+    closer if given.
+
+    Start-up returns as soon as the first case is indexed.
+    The other cases are appended to the case ID sequence on
+    a background thread, which is stopped when the dataset is
+    started up again. Failures of the thread are reported in
+    the indexing progress.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        case_loader: CaseLoader | None = None,
+        case_sizer: CaseSizer | None = None,
+        case_closer: CaseCloser | None = None,
+        prefetch_depth: int = PREFETCH_DEPTH,
+        case_cache_byte_budget: int = CASE_CACHE_BYTE_BUDGET,
+        discovery_worker_number: int = spreadsheet_builder.DISCOVERY_WORKER_NUMBER,
+        discovery_executor_type: str = spreadsheet_builder.DISCOVERY_EXECUTOR_TYPE,
+    ) -> None:
         self.case_id_sequence = None
-        self._dataset_spreadsheet = None
+        self._discovery_worker_number = discovery_worker_number
+        self._discovery_executor_type = discovery_executor_type
+        self._spreadsheet_builder = None
+        self._data_accessor_initialiser_map = {}
+        self._case_pointer_map = {}
+        self._indexing_thread = None
+        self._indexing_stop_event = None
+        self._indexing_failure = None
         self._case_pointer = None
+        self._cache_directory_path = None
+        self._transformation_store_file_path = None
+        self._case_loader = case_loader
+        self._case_sizer = case_sizer
+        self._case_closer = case_closer
+        self._prefetch_depth = prefetch_depth
+        self._prefetcher = None
+        self._case_cache = cache.LRUCache(case_cache_byte_budget, case_closer)
+        self._case_id_current = None
+        self._case_current = None
     
     def start_up(self, configuration: record.Configuration) -> None:
-        dataset_spreadsheet = self._construct_dataset_spreadsheet(configuration)
-        self.case_id_sequence = self._construct_case_id_sequence(
-            dataset_spreadsheet)
-        self._dataset_spreadsheet = dataset_spreadsheet
+        self._stop_indexing()
+        self._spreadsheet_builder = self._construct_spreadsheet_builder(
+            configuration)
+        manifest_file_path = self._build_manifest_file_path(configuration)
+        case_iterable = self._spreadsheet_builder.build_case_iterable(
+            self._read_manifest(manifest_file_path))
+        self.case_id_sequence = []  # Appended while indexing
+        self._data_accessor_initialiser_map = {}
+        self._case_pointer_map = {}
+        self._cache_directory_path = configuration['cache_directory_path']
+        self._transformation_store_file_path = configuration[
+            'transformation_store_file_path']
+        self._add_case(self._build_case_first(case_iterable))
         self._case_pointer = 0
+        if self._prefetcher is not None:
+            self._prefetcher.shut_down()
+        self._prefetcher = self._construct_prefetcher()
+        self._case_cache.clear()
+        if self._case_current is not None and self._case_closer is not None:
+            self._case_closer(self._case_current)
+        self._case_id_current = None
+        self._case_current = None
+        self._indexing_failure = None
+        self._indexing_stop_event = threading.Event()
+        self._indexing_thread = threading.Thread(
+            target = self._index,
+            args = (case_iterable, manifest_file_path, self._indexing_stop_event),
+            name = 'indexing',
+            daemon = True,
+        )
+        self._indexing_thread.start()
+    
+    def _stop_indexing(self) -> None:
+        if self._indexing_thread is not None:
+            self._indexing_stop_event.set()
+            self._indexing_thread.join()
+    
+    def _construct_spreadsheet_builder(
+        self, configuration: record.Configuration,
+    ) -> spreadsheet_builder.DatasetSpreadsheetBuilder:
+        # The builder is kept so that its progress can be read while building
+        return spreadsheet_builder.DatasetSpreadsheetBuilder(
+            configuration,
+            self._discovery_worker_number,
+            self._discovery_executor_type,
+        )
+    
+    def _build_case_first(
+        self, case_iterable: typing.Iterator[pd.DataFrame]) -> pd.DataFrame:
+        try:
+            return next(case_iterable)
+        except StopIteration:
+            raise ValueError('Can not find any cases in the dataset')
+    
+    def _index(
+        self,
+        case_iterable: typing.Generator[pd.DataFrame, None, None],
+        manifest_file_path: str,
+        stop_event: threading.Event,
+    ) -> None:
+        # Failures are kept for indexing progress, since nothing else would
+        # notice the thread stopping
+        try:
+            for case in case_iterable:
+                if stop_event.is_set():
+                    case_iterable.close()
+                    return
+                self._add_case(case)
+        except Exception as exception:
+            self._indexing_failure = exception
+            return
+        self._write_manifest(
+            self._spreadsheet_builder.manifest, manifest_file_path)
+    
+    def _add_case(self, case: pd.DataFrame) -> None:
+        # Cases are indexed before their IDs are appended to the sequence, so
+        # that any case ID read from the sequence can be looked up at once
+        for case_id, subcase in case.groupby('case_id', sort=False):
+            self._data_accessor_initialiser_map[case_id] = (
+                self._build_data_accessor_initialiser(case_id, subcase))
+        for case_id in self._construct_case_id_sequence(case):
+            self._case_pointer_map[case_id] = len(self.case_id_sequence)
+            self.case_id_sequence.append(case_id)
+    
+    @property
+    def is_indexing(self) -> bool:
+        return self._get_is_indexing_by_property()
+    
+    def _get_is_indexing_by_property(self) -> bool:
+        return (
+            self._indexing_thread is not None
+            and self._indexing_thread.is_alive()
+        )
+    
+    def _build_manifest_file_path(
+        self, configuration: record.Configuration) -> str:
+        return f'{configuration["dataset_directory_path"]}/{MANIFEST_FILE_NAME}'
     
-    def _construct_dataset_spreadsheet(
-        self, configuration: record.Configuration) -> pd.DataFrame:
-        builder = spreadsheet_builder.DatasetSpreadsheetBuilder(configuration)
-        dataset_spreadsheet = builder.build_spreadsheet()
-        return dataset_spreadsheet
+    def _read_manifest(
+        self, manifest_file_path: str) -> record.DatasetManifest | None:
+        # Missing or corrupted manifests are rebuilt from scratch
+        try:
+            return io_utils.read_file(manifest_file_path)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_manifest(
+        self, manifest: record.DatasetManifest, manifest_file_path: str) -> None:
+        # The manifest is replaced at once so that it is never left partial
+        try:
+            io_utils.write_file(manifest, f'{manifest_file_path}.tmp')
+            os.replace(f'{manifest_file_path}.tmp', manifest_file_path)
+        except OSError:
+            pass
 
     def _construct_case_id_sequence(
         self, dataset_spreadsheet: pd.DataFrame) -> tuple[str, ...]:
         return tuple(dataset_spreadsheet['case_id'].unique())
     
-    def build_data_accessor_initialiser(self) -> record.DataAccessorInitialiser:
+    def _construct_prefetcher(self) -> prefetcher.Prefetcher:
+        return prefetcher.Prefetcher(
+            lambda case_id: self._case_loader(
+                self._data_accessor_initialiser_map[case_id]),
+            self._case_closer,
+        )
+    
+    def load_case(self) -> typing.Any:
+        """Loads the current case by the case loader.
+        
+        Returns the cached or prefetched case if there is
+        one, then starts prefetching the uncached cases around
+        the current case and cancels the others. The case
+        loaded before is moved to the cache.
+        """
+        self._cache_case_current()
         case_id = self.case_id_sequence[self._case_pointer]
-        case = self._extract_case(case_id)
+        case = self._case_cache.get(case_id)
+        if case is None:
+            case = self._prefetcher.load(case_id)
+        else:
+            self._case_cache.pop(case_id)  # Current case is not cached
+        self._case_id_current = case_id
+        self._case_current = case
+        self._prefetcher.prefetch(self._build_neighbour_case_id_sequence())
+        return case
+    
+    def _cache_case_current(self) -> None:
+        # Cases are measured when leaving them, since they grow while in use
+        if self._case_current is not None:
+            self._case_cache.put(
+                self._case_id_current,
+                self._case_current,
+                self._case_sizer(self._case_current),
+            )
+    
+    def _build_neighbour_case_id_sequence(self) -> tuple[str, ...]:
+        # Next cases are prefetched before previous ones at the same distance
+        neighbour_case_pointer_sequence = (
+            self._case_pointer + offset
+            for distance in range(1, self._prefetch_depth+1)
+            for offset in (distance, -distance)
+        )
+        return tuple(
+            self.case_id_sequence[case_pointer]
+            for case_pointer in neighbour_case_pointer_sequence
+            if 0 <= case_pointer < len(self.case_id_sequence)
+            and self.case_id_sequence[case_pointer] not in self._case_cache
+        )
+    
+    @property
+    def indexing_progress(self) -> record.ProgressStatistics:
+        return self._get_indexing_progress_by_property()
+    
+    def _get_indexing_progress_by_property(self) -> record.ProgressStatistics:
+        if self._spreadsheet_builder is None:
+            return record.ProgressStatistics(
+                completed_number = 0, total_number = 0, failure_message = None)
+        else:
+            progress = self._spreadsheet_builder.progress
+            if self._indexing_failure is not None:
+                progress['failure_message'] = str(self._indexing_failure)
+            return progress
+    
+    @property
+    def case_cache_statistics(self) -> record.CacheStatistics:
+        return self._get_case_cache_statistics_by_property()
+    
+    def _get_case_cache_statistics_by_property(self) -> record.CacheStatistics:
+        return self._case_cache.statistics
+    
+    def _build_data_accessor_initialiser(
+        self, case_id: str, case: pd.DataFrame,
+    ) -> record.DataAccessorInitialiser:
         return record.DataAccessorInitialiser(
             case_id = case_id,
             body_file_path = self._extract_body_file_path(case),
@@ -60,13 +293,11 @@ class Dataset:
                 _extract_slice_mask_file_path_map(case),
             transformation_spreadsheet_file_path = self.
                 _extract_transformation_spreadsheet_file_path(case),
+            transformation_store_file_path = self.
+                _transformation_store_file_path,
+            cache_directory_path = self._cache_directory_path,
         )
     
-    def _extract_case(self, case_id: str) -> pd.DataFrame:
-        return self._dataset_spreadsheet.loc[
-            self._dataset_spreadsheet['case_id'] == case_id
-        ]
-    
     def _extract_body_file_path(self, case: pd.DataFrame) -> str:
         return case.iloc[0]['body_file_path']
 
@@ -117,4 +348,7 @@ class Dataset:
                 'Cannot access elements with indices equal to the length')
     
     def shift_case(self, case_id: str) -> None:
-        self._case_pointer = self.case_id_sequence.index(case_id)
\ No newline at end of file
+        try:
+            self._case_pointer = self._case_pointer_map[case_id]
+        except KeyError:
+            raise ValueError(f'Can not find case: {case_id}')
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""Cache.
+
+This module contains the implementation of caches used in
+the application. Cache is a tool that can keep recently used
+values in memory within a byte budget and evict the least
+recently used ones once the budget is exceeded.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+import collections
+import typing
+
+from object import record
+
+
+class LRUCache:
+    """Least-recently-used cache with a byte budget.
+
+    An object that can keep recently used values in memory
+    and evict the least recently used ones once the total
+    size of its entries exceeds the byte budget. Hits,
+    misses and evictions are counted for monitoring. Values
+    evicted, replaced, cleared or too large to be cached are
+    passed to the eviction callback if given.
+    """
+
+    def __init__(
+        self,
+        byte_budget: int,
+        on_evict: typing.Callable[[typing.Any], None] | None = None,
+    ) -> None:
+        self._byte_budget = byte_budget
+        self._on_evict = on_evict
+        self._entry_map = collections.OrderedDict()
+        self._resident_byte = 0
+        self._hit_count = 0
+        self._miss_count = 0
+        self._eviction_count = 0
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        return key in self._entry_map
+
+    def __len__(self) -> int:
+        return len(self._entry_map)
+
+    def get(
+        self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        if key in self._entry_map:
+            self._hit_count += 1
+            self._entry_map.move_to_end(key)
+            return self._entry_map[key][0]
+        else:
+            self._miss_count += 1
+            return default
+
+    def put(self, key: typing.Hashable, value: typing.Any, byte: int) -> None:
+        if key in self._entry_map:
+            value_replaced = self.pop(key)
+            if value_replaced is not value:  # Values put again are still in use
+                self._release(value_replaced)
+        if byte <= self._byte_budget:  # Oversized values are never cached
+            self._entry_map[key] = (value, byte)
+            self._resident_byte += byte
+            self._evict()
+        else:
+            self._release(value)
+
+    def _evict(self) -> None:
+        while self._resident_byte > self._byte_budget:
+            _, (value, byte) = self._entry_map.popitem(last=False)
+            self._resident_byte -= byte
+            self._eviction_count += 1
+            self._release(value)
+
+    def _release(self, value: typing.Any) -> None:
+        if self._on_evict is not None:
+            self._on_evict(value)
+
+    def pop(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        if key in self._entry_map:
+            value, byte = self._entry_map.pop(key)
+            self._resident_byte -= byte
+            return value
+        else:
+            return default
+
+    def clear(self) -> None:
+        for value, _ in self._entry_map.values():
+            self._release(value)
+        self._entry_map.clear()
+        self._resident_byte = 0
+
+    @property
+    def statistics(self) -> record.CacheStatistics:
+        return self._get_statistics_by_property()
+
+    def _get_statistics_by_property(self) -> record.CacheStatistics:
+        return record.CacheStatistics(
+            hit_count = self._hit_count,
+            miss_count = self._miss_count,
+            eviction_count = self._eviction_count,
+            entry_count = len(self._entry_map),
+            resident_byte = self._resident_byte,
+            byte_budget = self._byte_budget,
+        )
@@ -11,6 +11,7 @@ import abc
 
 import numpy as np
 
+from object import image_cache
 from object import record
 from utils import affine_utils
 from utils import image_processing_utils
@@ -39,6 +40,13 @@ class ImageABC(abc.ABC):
     
     def _get_pixel_data_by_property(self) -> np.ndarray:
         return np.array(self._pixel_data)
+    
+    @property
+    def nbyte(self) -> int:
+        return self._get_nbyte_by_property()
+    
+    def _get_nbyte_by_property(self) -> int:
+        return 0 if self._pixel_data is None else self._pixel_data.nbytes
 
 class ReadableImageABC(ImageABC):
     """Template of readable images.
@@ -46,20 +54,52 @@ class ReadableImageABC(ImageABC):
     A template of data structure that defines the
     representation of readable images in the application.
     Pixel data is constructed by loading from the given
-    image file and applying pre-processing to it.
+    image file and applying pre-processing to it. The file
+    is decoded only once, and all other data is constructed
+    from the same content. Given an image cache, the
+    pre-processed content is loaded from it if still valid
+    and written to it otherwise, in which case the content
+    before pre-processing is never available.
     """
 
     @abc.abstractmethod
     def _process(self, pixel_data: np.ndarray) -> np.ndarray:
         pass
 
-    def __init__(self, file_path: str) -> None:
-        self._pixel_data = self._construct_pixel_data(file_path)
+    def __init__(
+        self, file_path: str, cache: image_cache.ImageCache | None = None,
+    ) -> None:
+        self._set_up(*self._load(file_path, cache))
+    
+    def _load(
+        self, file_path: str, cache: image_cache.ImageCache | None,
+    ) -> tuple[record.ImageContent, record.ImageContent | None]:
+        # Returns the pre-processed content along with the content before
+        # pre-processing, which is only kept if there is no image cache
+        if cache is None:
+            image_unprocessed = io_utils.read_image(file_path)
+            return self._process_image(image_unprocessed), image_unprocessed
+        image = cache.get(file_path, type(self).__name__)
+        if image is None:
+            image = self._process_image(io_utils.read_image(file_path))
+            cache.put(file_path, type(self).__name__, image)
+        return image, None
+    
+    def _process_image(self, image: record.ImageContent) -> record.ImageContent:
+        return record.ImageContent(
+            pixel_data = self._process(image['pixel_data']),
+            affine = image['affine'],
+        )
     
-    def _construct_pixel_data(self, file_path: str) -> np.ndarray:
-        pixel_data = io_utils.read_pixel_data(file_path)
-        pixel_data = self._process(pixel_data)
-        return pixel_data
+    def _set_up(
+        self,
+        image: record.ImageContent,
+        image_unprocessed: record.ImageContent | None,
+    ) -> None:
+        self._pixel_data = self._construct_pixel_data(image)
+    
+    def _construct_pixel_data(self, image: record.ImageContent) -> np.ndarray:
+        return image['pixel_data']
 
 class RenderableImageABC(ReadableImageABC):
     """Template of renderable images in dash-vtk.
@@ -70,16 +110,40 @@ class RenderableImageABC(ReadableImageABC):
     plotted in the 3D plot by dash-vtk.
     """
 
-    def __init__(self, file_path: str) -> None:
-        super().__init__(file_path)
-        self._affine_original = self._construct_affine_original(file_path)
-        self._field = self._construct_field(file_path)
-
-    def _construct_affine_original(self, file_path: str) -> np.ndarray:
-        return matrix_utils.cast(io_utils.read_affine(file_path))
+    def _set_up(
+        self,
+        image: record.ImageContent,
+        image_unprocessed: record.ImageContent | None,
+    ) -> None:
+        super()._set_up(image, image_unprocessed)
+        self._affine_original = self._construct_affine_original(image)
+        self._field = self._construct_field(image, image_unprocessed)
+
+    def _construct_affine_original(
+        self, image: record.ImageContent) -> np.ndarray:
+        return matrix_utils.cast(image['affine'])
+    
+    def _construct_field(
+        self,
+        image: record.ImageContent,
+        image_unprocessed: record.ImageContent | None,
+    ) -> record.Field:
+        # Field is built from the pixel data before pre-processing. Image
+        # caches only keep pre-processed pixel data, so fields of cached
+        # images are built from it whether the cache is hit or not
+        if image_unprocessed is None:
+            return io_utils.build_field(image['pixel_data'])
+        else:
+            return io_utils.build_field(image_unprocessed['pixel_data'])
     
-    def _construct_field(self, file_path: str) -> record.Field:
-        return io_utils.read_field(file_path)
+    def _get_nbyte_by_property(self) -> int:
+        # Encoded field values are counted along with the pixel data
+        field_nbyte = (
+            len(self._field['values']['bvals'])
+            if isinstance(self._field['values'], dict)
+            else 0
+        )
+        return super()._get_nbyte_by_property() + field_nbyte
 
     @property
     def affine_original(self) -> np.ndarray:
@@ -113,12 +177,17 @@ class TransformableImageABC(RenderableImageABC):
     their states can be modified by transformation.
     """
 
-    def __init__(self, file_path: str) -> None:
-        super().__init__(file_path)
-        self._affine_current = self._construct_affine_current(file_path)
+    def _set_up(
+        self,
+        image: record.ImageContent,
+        image_unprocessed: record.ImageContent | None,
+    ) -> None:
+        super()._set_up(image, image_unprocessed)
+        self._affine_current = self._construct_affine_current(image)
 
-    def _construct_affine_current(self, file_path: str) -> np.ndarray:
-        return matrix_utils.cast(io_utils.read_affine(file_path))
+    def _construct_affine_current(
+        self, image: record.ImageContent) -> np.ndarray:
+        return np.array(self._affine_original)
     
     @property
     def state(self) -> record.State:
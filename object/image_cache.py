@@ -0,0 +1,87 @@
+"""Image Cache.
+
+This module contains the implementation of Image Cache used
+in the application. Image Cache is a tool that can keep
+decoded and pre-processed images on disk, so that loading
+them again does not require decoding their files.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+import hashlib
+import os
+
+import numpy as np
+
+from object import record
+from utils import io_utils
+
+
+class ImageCache:
+    """On-disk cache of decoded and pre-processed images.
+
+    An object that can keep decoded and pre-processed pixel
+    data uncompressed in a directory, alongside the affine
+    and the size and modification time of the image file.
+    Entries no longer matching their image files are
+    ignored, and valid ones are memory-mapped read-only, so
+    the page cache is shared by all processes reading them.
+    """
+
+    def __init__(self, directory_path: str) -> None:
+        self._directory_path = directory_path
+        os.makedirs(directory_path, exist_ok=True)
+
+    def get(
+        self, file_path: str, namespace: str) -> record.ImageContent | None:
+        # Namespaces separate images pre-processed differently from one file
+        entry_path = self._build_entry_path(file_path, namespace)
+        try:
+            entry = io_utils.read_file(f'{entry_path}.json')
+            if not self._is_valid(entry, file_path):
+                return None
+            pixel_data = np.load(f'{entry_path}.npy', mmap_mode='r')
+        except (KeyError, OSError, ValueError):
+            return None
+        return record.ImageContent(
+            pixel_data = pixel_data, affine = np.array(entry['affine']))
+
+    def _build_entry_path(self, file_path: str, namespace: str) -> str:
+        key = f'{namespace}:{os.path.abspath(file_path)}'
+        return f'{self._directory_path}/{hashlib.sha1(key.encode()).hexdigest()}'
+
+    def _is_valid(self, entry: record.ImageCacheEntry, file_path: str) -> bool:
+        entry_expected = self._build_entry(file_path)
+        return all(
+            entry[key] == entry_expected[key]
+            for key in ('file_path', 'file_size', 'file_modification_time')
+        )
+
+    def _build_entry(self, file_path: str) -> record.ImageCacheEntry:
+        file_status = os.stat(file_path)
+        return record.ImageCacheEntry(
+            file_path = os.path.abspath(file_path),
+            file_size = file_status.st_size,
+            file_modification_time = file_status.st_mtime_ns,
+            affine = [],
+        )
+
+    def put(
+        self, file_path: str, namespace: str, image: record.ImageContent,
+    ) -> None:
+        # Files are written under temporary names and then renamed, where the
+        # entry is renamed last so that it never refers to partial pixel data.
+        # Images failing to be cached are simply loaded again next time.
+        entry_path = self._build_entry_path(file_path, namespace)
+        temporary_path = f'{entry_path}-{os.getpid()}-{id(image)}'
+        entry = self._build_entry(file_path)
+        entry['affine'] = np.asarray(image['affine']).tolist()
+        try:
+            io_utils.write_file(
+                np.asarray(image['pixel_data']), f'{temporary_path}.npy')
+            io_utils.write_file(dict(entry), f'{temporary_path}.json')
+            os.replace(f'{temporary_path}.npy', f'{entry_path}.npy')
+            os.replace(f'{temporary_path}.json', f'{entry_path}.json')
+        except OSError:
+            pass
@@ -0,0 +1,235 @@
+"""Interpolator.
+
+This module contains the abstract template and concrete
+implementations of different interpolators used in the
+application. Interpolator is a tool that can sample 3D pixel
+data stored on a uniform grid at fractional array indices.
+Pixel data is kept in its native data type and sampled
+values are returned as float32.
+
+Sampling is split into building the interpolation weight
+and applying it to the pixel data, so that the same weight
+can be applied to multiple volumes sharing the same grid.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+import abc
+import itertools
+import typing
+
+import numpy as np
+from scipy import interpolate
+
+from object import record
+from utils import matrix_utils
+
+
+FILL_VALUE = 0
+
+IndexWeightPair: typing.TypeAlias = tuple[
+    tuple[np.ndarray, ...], tuple[np.ndarray, ...]]
+
+
+class InterpolatorABC(abc.ABC):
+    """Template of interpolators.
+
+    A template of object that can sample 3D pixel data on a
+    uniform grid at the given fractional array indices.
+    Indices outside the grid are filled with FILL_VALUE,
+    which matches the behaviour of
+    scipy.interpolate.RegularGridInterpolator with
+    bounds_error=False.
+    """
+
+    @abc.abstractmethod
+    def _build_index_weight_pair(self, grid_index: np.ndarray) -> IndexWeightPair:
+        pass
+
+    @abc.abstractmethod
+    def _interpolate(self, weight: record.InterpolationWeight) -> np.ndarray:
+        pass
+
+    def __init__(self, grid_pixel_data: np.ndarray, method: str) -> None:
+        self._method = method
+        self._grid_size = grid_pixel_data.shape
+        self._grid_stride = self._construct_grid_stride()
+        self._grid_pixel_data = self._construct_grid_pixel_data(
+            grid_pixel_data)
+
+    def _construct_grid_stride(self) -> tuple[int, int, int]:
+        return (self._grid_size[1]*self._grid_size[2], self._grid_size[2], 1)
+
+    def _construct_grid_pixel_data(
+        self, grid_pixel_data: np.ndarray) -> np.ndarray:
+        return np.ravel(grid_pixel_data)  # No copy and no upcast if contiguous
+
+    @property
+    def nbyte(self) -> int:
+        return self._get_nbyte_by_property()
+
+    def _get_nbyte_by_property(self) -> int:
+        return self._grid_pixel_data.nbytes
+
+    def __call__(self, grid_index: np.ndarray) -> np.ndarray:
+        return self.interpolate(self.build_weight(grid_index))
+
+    def build_weight(self, grid_index: np.ndarray) -> record.InterpolationWeight:
+        # Grid index looks like [..., (i, j, k)] and the interpolated pixel
+        # data has the shape of its leading dimensions
+        grid_index = matrix_utils.cast(grid_index)
+        is_inside = self._build_is_inside(grid_index)
+        flat_index_sequence, weight_sequence = self._build_index_weight_pair(
+            np.where(is_inside[..., np.newaxis], grid_index, 0))
+        return record.InterpolationWeight(
+            method = self._method,
+            grid_size = self._grid_size,
+            grid_index = grid_index,
+            is_inside = is_inside,
+            flat_index_sequence = flat_index_sequence,
+            weight_sequence = weight_sequence,
+        )
+
+    def _build_is_inside(self, grid_index: np.ndarray) -> np.ndarray:
+        return np.all(
+            (grid_index >= 0) & (grid_index <= np.subtract(self._grid_size, 1)),
+            axis = -1,
+        )
+
+    def _build_flat_index(
+        self, axis_index_sequence: tuple[np.ndarray, ...]) -> np.ndarray:
+        return sum(
+            axis_index * stride
+            for axis_index, stride
+            in zip(axis_index_sequence, self._grid_stride)
+        )
+
+    def can_interpolate(self, weight: record.InterpolationWeight) -> bool:
+        return (
+            weight['method'] == self._method
+            and weight['grid_size'] == self._grid_size
+        )
+
+    def interpolate(self, weight: record.InterpolationWeight) -> np.ndarray:
+        pixel_data = self._interpolate(weight)
+        pixel_data = matrix_utils.cast(pixel_data)
+        pixel_data[~weight['is_inside']] = FILL_VALUE
+        return pixel_data
+
+class LinearInterpolator(InterpolatorABC):
+    """Interpolator using trilinear interpolation.
+
+    An object that can sample 3D pixel data at fractional
+    array indices by weighting the 8 surrounding pixels.
+    """
+
+    def __init__(self, grid_pixel_data: np.ndarray) -> None:
+        super().__init__(grid_pixel_data, 'linear')
+
+    def _build_index_weight_pair(self, grid_index: np.ndarray) -> IndexWeightPair:
+        lower_sequence, upper_sequence, fraction_sequence = self._build_neighbour(
+            grid_index)
+        flat_index_sequence = []
+        weight_sequence = []
+        for corner in itertools.product((False, True), repeat=3):
+            flat_index_sequence.append(self._build_flat_index(tuple(
+                upper if is_upper else lower
+                for is_upper, lower, upper
+                in zip(corner, lower_sequence, upper_sequence)
+            )))
+            weight_sequence.append(
+                self._build_corner_weight(corner, fraction_sequence))
+        return tuple(flat_index_sequence), tuple(weight_sequence)
+
+    def _build_neighbour(
+        self, grid_index: np.ndarray,
+    ) -> tuple[tuple[np.ndarray, ...], tuple[np.ndarray, ...], tuple[np.ndarray, ...]]:
+        lower_sequence = tuple(
+            # Clipping keeps indices at the last pixel interpolable
+            np.clip(np.floor(grid_index[..., axis]), 0, max(size-2, 0)).astype(np.intp)
+            for axis, size in enumerate(self._grid_size)
+        )
+        upper_sequence = tuple(
+            np.minimum(lower+1, size-1)
+            for lower, size in zip(lower_sequence, self._grid_size)
+        )
+        fraction_sequence = tuple(
+            grid_index[..., axis] - lower
+            for axis, lower in enumerate(lower_sequence)
+        )
+        return lower_sequence, upper_sequence, fraction_sequence
+
+    def _build_corner_weight(
+        self,
+        corner: tuple[bool, bool, bool],
+        fraction_sequence: tuple[np.ndarray, ...],
+    ) -> np.ndarray:
+        weight = np.ones_like(fraction_sequence[0])
+        for is_upper, fraction in zip(corner, fraction_sequence):
+            weight *= fraction if is_upper else 1-fraction
+        return weight
+
+    def _interpolate(self, weight: record.InterpolationWeight) -> np.ndarray:
+        pixel_data = np.zeros(weight['is_inside'].shape, np.float32)
+        for flat_index, corner_weight in zip(
+            weight['flat_index_sequence'], weight['weight_sequence']):
+            pixel_data += corner_weight * self._grid_pixel_data[flat_index]
+        return pixel_data
+
+class NearestInterpolator(InterpolatorABC):
+    """Interpolator using nearest-neighbour interpolation.
+
+    An object that can sample 3D pixel data at fractional
+    array indices by picking the closest pixel. Ties are
+    rounded down to be consistent with scipy.
+    """
+
+    def __init__(self, grid_pixel_data: np.ndarray) -> None:
+        super().__init__(grid_pixel_data, 'nearest')
+
+    def _build_index_weight_pair(self, grid_index: np.ndarray) -> IndexWeightPair:
+        flat_index = self._build_flat_index(tuple(
+            np.clip(np.ceil(grid_index[..., axis]-0.5), 0, size-1).astype(np.intp)
+            for axis, size in enumerate(self._grid_size)
+        ))
+        return (flat_index,), ()
+
+    def _interpolate(self, weight: record.InterpolationWeight) -> np.ndarray:
+        return self._grid_pixel_data[weight['flat_index_sequence'][0]]
+
+class ScipyInterpolator(InterpolatorABC):
+    """Interpolator backed by scipy.
+
+    An object that can sample 3D pixel data at fractional
+    array indices with any method supported by
+    scipy.interpolate.RegularGridInterpolator. Only the grid
+    index can be shared with other interpolators.
+    """
+
+    def __init__(self, grid_pixel_data: np.ndarray, method: str) -> None:
+        super().__init__(grid_pixel_data, method)
+        self._interpolator = self._construct_interpolator(grid_pixel_data)
+
+    def _construct_interpolator(
+        self, grid_pixel_data: np.ndarray,
+    ) -> interpolate.RegularGridInterpolator:
+        return interpolate.RegularGridInterpolator(
+            points = self._build_grid_point(),
+            values = grid_pixel_data,
+            method = self._method,
+            bounds_error = False,
+            fill_value = FILL_VALUE,
+        )
+
+    def _build_grid_point(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return tuple(
+            np.linspace(start=0, stop=dimension, num=dimension, endpoint=False)
+            for dimension in self._grid_size
+        )
+
+    def _build_index_weight_pair(self, grid_index: np.ndarray) -> IndexWeightPair:
+        return (), ()
+
+    def _interpolate(self, weight: record.InterpolationWeight) -> np.ndarray:
+        return self._interpolator(weight['grid_index'])
@@ -0,0 +1,232 @@
+"""Journal.
+
+This module contains the implementation of journals used in
+the application. Journal is a tool that can durably record
+changes as fixed-size records appended to a binary file, so
+that changes not saved yet can be replayed after a crash.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+import typing
+import weakref
+import zlib
+
+import numpy as np
+
+
+SYNC_INTERVAL = 1.0  # Seconds between synchronisations to disk at most
+PARAMETER_LENGTH = 6  # This is currently hard-coded to rigid transformations
+RECORD_DATA_TYPE = np.dtype([
+    ('slice_index', '<u4'),
+    ('slice_checksum', '<u4'),
+    ('parameter', '<f8', (PARAMETER_LENGTH,)),
+    ('timestamp', '<f8'),
+])
+
+_transformation_journal_map = weakref.WeakValueDictionary()
+_transformation_journal_map_lock = threading.Lock()
+
+
+def open_transformation_journal(
+    file_path: str, slice_id_sequence: tuple[str, ...],
+) -> TransformationJournal:
+    """Returns the journal of the file, creating it if needed.
+
+    Cases loaded more than once share the journal of their
+    file, so that compacting it on behalf of one of them never
+    loses records appended on behalf of another.
+    """
+    with _transformation_journal_map_lock:
+        journal = _transformation_journal_map.get(file_path)
+        if journal is None:
+            journal = TransformationJournal(file_path, slice_id_sequence)
+            _transformation_journal_map[file_path] = journal
+        else:
+            journal.extend(slice_id_sequence)
+        return journal
+
+
+class TransformationJournal:
+    """Journal of transformations of a case.
+
+    An object that appends every transformation of slices in
+    a case as a fixed-size record to a journal file. Records
+    are flushed on every append and synchronised to disk at
+    most every SYNC_INTERVAL seconds, or SYNC_INTERVAL seconds
+    after the last append when appends stop. Slices are identified by
+    their indices in the case along with checksums of their
+    IDs, so that records of slices no longer in the case are
+    ignored on replay. Records are counted from the creation
+    of the journal, and those saved elsewhere can be
+    compacted away.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        slice_id_sequence: tuple[str, ...],
+        sync_interval: float = SYNC_INTERVAL,
+    ) -> None:
+        self._file_path = file_path
+        self._slice_id_sequence = tuple(slice_id_sequence)
+        self._slice_index_map = self._construct_slice_index_map()
+        self._sync_interval = sync_interval
+        self._file = None
+        self._sync_time = 0.0
+        self._sync_timer = None
+        self._record_offset = 0  # Number of records compacted away
+        self._record_number = self._construct_record_number()
+        self._lock = threading.Lock()
+
+    def _construct_slice_index_map(self) -> dict[str, int]:
+        return {
+            slice_id: i for i, slice_id in enumerate(self._slice_id_sequence)}
+    
+    def extend(self, slice_id_sequence: tuple[str, ...]) -> None:
+        """Adds slices not journaled yet, keeping indices of the others."""
+        with self._lock:
+            self._slice_id_sequence += tuple(
+                slice_id for slice_id in slice_id_sequence
+                if slice_id not in self._slice_index_map
+            )
+            self._slice_index_map = self._construct_slice_index_map()
+
+    def _construct_record_number(self) -> int:
+        # A partial record left by a crash is not counted and is overwritten
+        try:
+            return os.path.getsize(self._file_path) // RECORD_DATA_TYPE.itemsize
+        except OSError:
+            return 0
+
+    @property
+    def record_number(self) -> int:
+        return self._get_record_number_by_property()
+
+    def _get_record_number_by_property(self) -> int:
+        return self._record_offset + self._record_number
+
+    def append(self, slice_id: str, parameter: tuple[float, ...]) -> None:
+        record = self._build_record(slice_id, parameter)
+        with self._lock:
+            if self._file is None:
+                self._file = self._open()
+            self._file.write(record.tobytes())
+            self._file.flush()
+            self._record_number += 1
+            if time.monotonic() - self._sync_time >= self._sync_interval:
+                self._sync()
+            else:
+                self._schedule_sync()
+
+    def _build_record(
+        self, slice_id: str, parameter: tuple[float, ...]) -> np.ndarray:
+        record = np.zeros(1, RECORD_DATA_TYPE)
+        record['slice_index'] = self._slice_index_map[slice_id]
+        record['slice_checksum'] = self._build_checksum(slice_id)
+        record['parameter'] = parameter
+        record['timestamp'] = time.time()
+        return record
+
+    def _build_checksum(self, slice_id: str) -> int:
+        return zlib.crc32(slice_id.encode())
+
+    def _open(self) -> typing.BinaryIO:
+        file = open(self._file_path, 'ab')
+        file.truncate(self._record_number * RECORD_DATA_TYPE.itemsize)
+        return file
+
+    def _sync(self) -> None:
+        os.fsync(self._file.fileno())
+        self._sync_time = time.monotonic()
+    
+    def _schedule_sync(self) -> None:
+        # The last appends before users go idle are synchronised by a timer
+        if self._sync_timer is None:
+            self._sync_timer = threading.Timer(
+                self._sync_interval, self._sync_by_timer)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+    
+    def _sync_by_timer(self) -> None:
+        with self._lock:
+            self._sync_timer = None
+            if self._file is not None:
+                self._sync()
+
+    def replay(self) -> dict[str, tuple[float, ...]]:
+        """Returns the latest parameter recorded for each slice.
+
+        Slices added by other cases sharing the journal may be
+        included, and are left to callers to filter out.
+        """
+        with self._lock:
+            record_sequence = self._read(0)
+        parameter_map = {}
+        for record in record_sequence:
+            slice_index = int(record['slice_index'])
+            if (
+                slice_index < len(self._slice_id_sequence)
+                and int(record['slice_checksum']) == self._build_checksum(
+                    self._slice_id_sequence[slice_index])
+            ):
+                parameter_map[self._slice_id_sequence[slice_index]] = tuple(
+                    float(value) for value in record['parameter'])
+        return parameter_map
+
+    def _read(self, start: int) -> np.ndarray:
+        try:
+            return np.fromfile(
+                self._file_path,
+                dtype = RECORD_DATA_TYPE,
+                count = max(self._record_number-start, 0),
+                offset = start * RECORD_DATA_TYPE.itemsize,
+            )
+        except OSError:
+            return np.zeros(0, RECORD_DATA_TYPE)
+
+    def compact(self, record_number: int) -> None:
+        """Removes the given number of records counted from creation."""
+        with self._lock:
+            start = record_number - self._record_offset
+            if start <= 0:
+                return
+            record_sequence = self._read(start)
+            self._close()
+            if len(record_sequence) == 0:
+                self._remove()
+            else:
+                self._replace(record_sequence)
+            self._record_offset = record_number
+            self._record_number = len(record_sequence)
+
+    def _remove(self) -> None:
+        try:
+            os.remove(self._file_path)
+        except FileNotFoundError:
+            pass
+
+    def _replace(self, record_sequence: np.ndarray) -> None:
+        # The journal is replaced at once so that it is never left partial
+        with open(f'{self._file_path}.tmp', 'wb') as file:
+            file.write(record_sequence.tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(f'{self._file_path}.tmp', self._file_path)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
@@ -0,0 +1,74 @@
+"""Prefetcher.
+
+This module contains the implementation of prefetchers used
+in the application. Prefetcher is a tool that can load
+values on a background worker before they are requested, so
+that requesting them later returns almost instantly.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+from concurrent import futures
+import threading
+import typing
+
+
+class Prefetcher:
+    """Prefetcher loading values on a background worker.
+
+    An object that can load values by key on a background
+    worker ahead of time. Keys are prefetched in the given
+    order, and keys no longer wanted are cancelled if their
+    loading has not started yet, or discarded otherwise.
+    Values discarded are passed to the discard callback if
+    given, once their loading is done. Keys not prefetched
+    are loaded in the calling thread.
+    """
+
+    def __init__(
+        self,
+        loader: typing.Callable[[typing.Hashable], typing.Any],
+        on_discard: typing.Callable[[typing.Any], None] | None = None,
+    ) -> None:
+        self._loader = loader
+        self._on_discard = on_discard
+        self._executor = futures.ThreadPoolExecutor(
+            1, thread_name_prefix='prefetching')
+        self._future_map = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, key_sequence: tuple[typing.Hashable, ...]) -> None:
+        with self._lock:
+            for key in tuple(self._future_map):
+                if key not in key_sequence:
+                    self._discard(self._future_map.pop(key))
+            for key in key_sequence:
+                if key not in self._future_map:
+                    self._future_map[key] = self._executor.submit(
+                        self._loader, key)
+
+    def _discard(self, future: futures.Future) -> None:
+        # Loading already started can not be cancelled, so its value is
+        # released once done (or at once if done already)
+        if not future.cancel() and self._on_discard is not None:
+            future.add_done_callback(self._release)
+
+    def _release(self, future: futures.Future) -> None:
+        if future.exception() is None:
+            self._on_discard(future.result())
+
+    def load(self, key: typing.Hashable) -> typing.Any:
+        with self._lock:
+            future = self._future_map.pop(key, None)
+        if future is None or future.cancelled():
+            return self._loader(key)
+        else:
+            return future.result()  # Waits if the loading is in progress
+
+    def cancel(self) -> None:
+        self.prefetch(())
+
+    def shut_down(self) -> None:
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
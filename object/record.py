@@ -15,6 +15,11 @@ import numpy as np
 
 from object import transformation
 
+if typing.TYPE_CHECKING:
+    from object import cache
+    from object import resampler
+    from persistence_layer import data_accessor
+
 
 # ----- Configuration -----
 class Configuration(typing.TypedDict):
@@ -24,6 +29,45 @@ class Configuration(typing.TypedDict):
     file_name: dict[str, str]
     pattern: dict[str, str]
     tag: dict[str, str]
+    cache_directory_path: str | None
+    transformation_store_file_path: str | None
+    organ_resampled_compression_level: int | None
+
+
+# ----- Content -----
+class Case(typing.TypedDict):
+    """Data loaded for a case and kept across case switches."""
+    data_accessor: data_accessor.DataAccessor
+    resampling_state: ResamplingState | None
+
+class ImageContent(typing.TypedDict):
+    """Data decoded from an image file."""
+    pixel_data: np.ndarray
+    affine: np.ndarray
+
+class ImageHeader(typing.TypedDict):
+    """Data read from an image header without pixel data."""
+    affine: np.ndarray
+    shape: tuple[int, ...]
+    dtype: np.dtype
+
+class ImageCacheEntry(typing.TypedDict):
+    """Data used to validate cached images against their files."""
+    file_path: str
+    file_size: int
+    file_modification_time: int
+    affine: list[list[float]]
+
+
+class DatasetManifest(typing.TypedDict):
+    """Dataset spreadsheet persisted to skip unchanged cases."""
+    configuration_hash: str
+    case_map: dict[str, DatasetManifestCase]
+
+class DatasetManifestCase(typing.TypedDict):
+    """Rows of a case in the dataset spreadsheet and their origin."""
+    modification_time: int
+    row_map: dict[str, list]
 
 
 # ----- Event -----
@@ -47,6 +91,8 @@ class DataAccessorInitialiser(typing.TypedDict):
     slice_file_path_map: dict[str, str]
     slice_mask_file_path_map: dict[str, str]
     transformation_spreadsheet_file_path: str
+    transformation_store_file_path: str | None
+    cache_directory_path: str | None
 
 class EvaluationProcessingUnitInitialiser(typing.TypedDict):
     """Data required to initialise Evaluation Processing Unit."""
@@ -80,6 +126,24 @@ class VisualisationProcessingUnitInitialiser(typing.TypedDict):
     slice_pixel_data: np.ndarray
 
 
+# ----- Interpolation -----
+class InterpolationWeight(typing.TypedDict):
+    """Data required by interpolators to sample pixel data."""
+    method: str
+    grid_size: tuple[int, int, int]
+    grid_index: np.ndarray
+    is_inside: np.ndarray
+    flat_index_sequence: tuple[np.ndarray, ...]
+    weight_sequence: tuple[np.ndarray, ...]
+
+class ResamplingWeight(typing.TypedDict):
+    """Data required by resamplers to resample pixel data."""
+    stride: int
+    row_range: tuple[int, int]
+    plain_mask: np.ndarray
+    interpolation_weight: InterpolationWeight
+
+
 # ----- Property -----
 class Body3DProperty(typing.TypedDict):
     """Visual properties of 3D body images."""
@@ -123,6 +187,14 @@ class Slice2DProperty(typing.TypedDict):
     visibility: int
 
 
+# ----- Shared Memory -----
+class SharedArray(typing.TypedDict):
+    """Data required to attach to an array in shared memory."""
+    name: str
+    shape: tuple[int, ...]
+    data_type: str
+
+
 # ----- State -----
 class State(typing.TypedDict):
     """Data required to render the 3D object by dash-vtk."""
@@ -142,4 +214,27 @@ class Field(typing.TypedDict):
     numberOfComponents: int
     dataRange: tuple[float, float]
     type: str
-    values: dict | list
\ No newline at end of file
+    values: dict | list
+
+class ResamplingState(typing.TypedDict):
+    """State of Resampling Processing Unit built for a case."""
+    body_resampler: resampler.Body3DResampler
+    organ_resampler: resampler.Organ3DResampler
+    cache: cache.LRUCache
+
+
+# ----- Statistics -----
+class ProgressStatistics(typing.TypedDict):
+    """Progress of long-running tasks."""
+    completed_number: int
+    total_number: int
+    failure_message: str | None
+
+class CacheStatistics(typing.TypedDict):
+    """Usage statistics of caches."""
+    hit_count: int
+    miss_count: int
+    eviction_count: int
+    entry_count: int
+    resident_byte: int
+    byte_budget: int
\ No newline at end of file
@@ -10,18 +10,25 @@ Date: 06/04/2023
 """
 from __future__ import annotations
 import abc
+from concurrent import futures
+import math
+import typing
 
 import numpy as np
-from scipy import interpolate
 
+from object import interpolator
 from object import record
+from utils import matrix_utils
 
 
-# Please check here for more interpolation methods:
+# 'linear' and 'nearest' are handled by the native interpolators, while other
+# methods fall back to scipy. Please check here for more interpolation methods:
 # https://docs.scipy.org/doc/scipy/reference/generated/scipy.interpolate.RegularGridInterpolator.html#scipy.interpolate.RegularGridInterpolator
 BODY_INTERPOLATION_METHOD = 'linear'
 SINGLE_ORGAN_INTERPOLATION_METHOD = 'linear'
 MULTI_ORGAN_INTERPOLATION_METHOD = 'nearest'
+CULLING_TOLERANCE = 1e-3  # Pixels kept by culling are still checked by interpolators
+TILE_ROW_NUMBER = 64  # Rows of the plain sampled by each task on the thread pool
 
 
 class ResamplerABC(abc.ABC):
@@ -29,35 +36,43 @@ class ResamplerABC(abc.ABC):
 
     A template of object that can resample 3D pixel data
     onto the 2D plane defined by the given affine matrix.
+    Only pixels in the intersection between the plane and
+    the grid (and within the region of interest if given) are
+    sampled, while the rest are filled with 0. Planes can be
+    sampled every stride pixels and upscaled for previews.
+    Given a thread pool, planes are split into row tiles that
+    are sampled concurrently into the same output. The data
+    type holding resampled values exactly is decided once
+    from the grid.
     """
 
     @abc.abstractmethod
     def _select_interpolator_method(self, grid_pixel_data: np.ndarray) -> str:
         pass
 
-    def __init__(self, initialiser: record.ResamplerInitialiser) -> None:
+    def __init__(
+        self,
+        initialiser: record.ResamplerInitialiser,
+        thread_pool: futures.ThreadPoolExecutor | None = None,
+    ) -> None:
+        self._thread_pool = thread_pool
         self._plain_size = initialiser['plain_size']
-        self._plain_index = self._construct_plain_index()
+        self._plain_axis_index_pair = self._construct_plain_axis_index_pair()
+        self._grid_size = initialiser['grid_pixel_data'].shape
         self._grid_affine_inversed = self._construct_grid_affine_inversed(
             initialiser['grid_affine'])
         self._interpolator = self._construct_interpolator(
             initialiser['grid_pixel_data'])
+        self._resampled_data_type = self._construct_resampled_data_type(
+            initialiser['grid_pixel_data'])
     
-    def _construct_plain_index(self) -> np.ndarray:
-        # Plain index looks like
-        # [
-        #   [x_1, x_2, x_3, ...],
-        #   [y_1, y_2, y_3, ...],
-        #   [z_1, z_2, z_3, ...],
-        #   [1, 1, 1, ...],
-        # ]
-        # where (x, y, z) are the index of points in the plain
-        return np.column_stack(
-            tuple(
-                (x, y, 0, 1)
-                for x in range(self._plain_size[0])
-                for y in range(self._plain_size[1])
-            )
+    def _construct_plain_axis_index_pair(
+        self) -> tuple[np.ndarray, np.ndarray]:
+        # Only the x and y axes of the plain index are stored, where points
+        # in the plain are (x, y, 0, 1) and can be generated by broadcasting
+        return tuple(
+            np.arange(dimension, dtype=matrix_utils.PRECISION)
+            for dimension in self._plain_size
         )
     
     def _construct_grid_affine_inversed(
@@ -65,57 +80,278 @@ class ResamplerABC(abc.ABC):
         return np.linalg.inv(grid_affine)
     
     def _construct_interpolator(
-        self, grid_pixel_data: np.ndarray,
-    ) -> interpolate.RegularGridInterpolator:
-        return interpolate.RegularGridInterpolator(
-            points = self._build_grid_point(grid_pixel_data.shape),
-            values = grid_pixel_data,
-            method = self._select_interpolator_method(grid_pixel_data),
-            bounds_error = False,
-            fill_value = 0,
+        self, grid_pixel_data: np.ndarray) -> interpolator.InterpolatorABC:
+        match self._select_interpolator_method(grid_pixel_data):
+            case 'linear':
+                return interpolator.LinearInterpolator(grid_pixel_data)
+            case 'nearest':
+                return interpolator.NearestInterpolator(grid_pixel_data)
+            case method:
+                return interpolator.ScipyInterpolator(grid_pixel_data, method)
+    
+    def _construct_resampled_data_type(self, grid_pixel_data: np.ndarray) -> type:
+        # Nearest neighbours only take values of the grid or the fill value,
+        # which are held exactly by the compact data type of their range
+        if self._select_interpolator_method(grid_pixel_data) == 'nearest':
+            return matrix_utils.cast_compact(np.array(
+                (0, np.amin(grid_pixel_data), np.amax(grid_pixel_data)),
+                grid_pixel_data.dtype,
+            )).dtype.type
+        else:
+            return matrix_utils.PRECISION
+    
+    @property
+    def resampled_data_type(self) -> type:
+        return self._get_resampled_data_type_by_property()
+    
+    def _get_resampled_data_type_by_property(self) -> type:
+        return self._resampled_data_type
+    
+    @property
+    def nbyte(self) -> int:
+        return self._get_nbyte_by_property()
+    
+    def _get_nbyte_by_property(self) -> int:
+        return self._interpolator.nbyte
+    
+    def resample(
+        self,
+        plain_affine: np.ndarray,
+        plain_roi: np.ndarray | None = None,
+        stride: int = 1,
+    ) -> np.ndarray:
+        return self.resample_batch(
+            plain_affine[np.newaxis],
+            None if plain_roi is None else plain_roi[np.newaxis],
+            stride,
+        )[0]
+    
+    def resample_batch(
+        self,
+        plain_affine_stack: np.ndarray,
+        plain_roi_stack: np.ndarray | None = None,
+        stride: int = 1,
+    ) -> np.ndarray:
+        plain_pixel_data_stack = self.build_plain_pixel_data_stack(
+            len(plain_affine_stack), stride)
+        
+        def resample_tile(row_range: tuple[int, int]) -> None:
+            self.resample_by_weight(
+                self.build_weight(
+                    plain_affine_stack, plain_roi_stack, stride, row_range),
+                plain_pixel_data_stack,
+            )
+        
+        self.map_tile(resample_tile, stride)
+        return self.upscale(plain_pixel_data_stack, stride)
+    
+    def build_plain_pixel_data_stack(
+        self, plain_number: int, stride: int = 1) -> np.ndarray:
+        return np.zeros(
+            (plain_number, *self.build_plain_size(stride)),
+            matrix_utils.PRECISION,
         )
     
-    def _build_grid_point(
-        self, grid_size: tuple[int, int, int],
-    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    def build_plain_size(self, stride: int = 1) -> tuple[int, int]:
+        return tuple(math.ceil(dimension / stride) for dimension in self._plain_size)
+    
+    def map_tile(
+        self,
+        function: typing.Callable[[tuple[int, int]], None],
+        stride: int = 1,
+    ) -> None:
+        """Calls the function on each row range of the plain."""
+        row_range_sequence = self._build_row_range_sequence(stride)
+        if self._thread_pool is None or len(row_range_sequence) == 1:
+            for row_range in row_range_sequence:
+                function(row_range)
+        else:
+            for future in tuple(
+                self._thread_pool.submit(function, row_range)
+                for row_range in row_range_sequence
+            ):
+                future.result()
+    
+    def _build_row_range_sequence(
+        self, stride: int) -> tuple[tuple[int, int], ...]:
+        row_number = self.build_plain_size(stride)[0]
+        if self._thread_pool is None:
+            return ((0, row_number),)
         return tuple(
-            np.linspace(start=0, stop=dimension, num=dimension, endpoint=False)
-            for dimension in grid_size
+            (start, min(start+TILE_ROW_NUMBER, row_number))
+            for start in range(0, row_number, TILE_ROW_NUMBER)
         )
     
-    def resample(self, plain_affine: np.ndarray) -> np.ndarray:
-        plain_point = self._build_plain_point(plain_affine)
-        plain_pixel_data = self._interpolator(plain_point)
-        plain_pixel_data = np.reshape(plain_pixel_data, self._plain_size)
-        return plain_pixel_data
+    def build_weight(
+        self,
+        plain_affine_stack: np.ndarray,
+        plain_roi_stack: np.ndarray | None = None,
+        stride: int = 1,
+        row_range: tuple[int, int] | None = None,
+    ) -> record.ResamplingWeight:
+        # Row range is counted in rows of the plain sampled at the stride
+        if row_range is None:
+            row_range = (0, self.build_plain_size(stride)[0])
+        plain_axis_index_pair = self._build_plain_axis_index_pair(
+            stride, row_range)
+        plain_to_grid_affine = self._build_plain_to_grid_affine(
+            plain_affine_stack)
+        plain_mask = self._build_plain_mask(
+            plain_to_grid_affine, plain_axis_index_pair)
+        if plain_roi_stack is not None:
+            plain_mask &= self._build_plain_roi_stack(
+                plain_roi_stack, stride, row_range)
+        return record.ResamplingWeight(
+            stride = stride,
+            row_range = row_range,
+            plain_mask = plain_mask,
+            interpolation_weight = self._interpolator.build_weight(
+                self._build_grid_index(
+                    plain_to_grid_affine, plain_axis_index_pair, plain_mask)),
+        )
     
-    def _build_plain_point(self, plain_affine: np.ndarray) -> np.ndarray:
-        grid_index = self._build_grid_index(plain_affine)
-        plain_point = self._convert_grid_index_to_plain_point(grid_index)
-        return plain_point
+    def _build_plain_axis_index_pair(
+        self, stride: int, row_range: tuple[int, int],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        index_x, index_y = self._plain_axis_index_pair
+        return index_x[::stride][slice(*row_range)], index_y[::stride]
     
-    def _build_grid_index(self, plain_affine: np.ndarray) -> np.ndarray:
-        return self._grid_affine_inversed @ plain_affine @ self._plain_index
+    def _build_plain_roi_stack(
+        self,
+        plain_roi_stack: np.ndarray,
+        stride: int,
+        row_range: tuple[int, int],
+    ) -> np.ndarray:
+        plain_roi_stack = plain_roi_stack[:, ::stride, ::stride]
+        return plain_roi_stack[:, slice(*row_range)].astype(bool)
     
-    def _convert_grid_index_to_plain_point(
-        # Convert the grid index from
-        # [
-        #   [x_1, x_2, x_3, ...],
-        #   [y_1, y_2, y_3, ...],
-        #   [z_1, z_2, z_3, ...],
-        #   [1, 1, 1, ...],
-        # ]
-        # to
+    def adapt_weight(
+        self,
+        weight: record.ResamplingWeight,
+        plain_roi_stack: np.ndarray | None = None,
+    ) -> record.ResamplingWeight:
+        """Adapts the weight built by a resampler sharing the same geometry."""
+        if plain_roi_stack is not None:
+            return self._restrict_weight(weight, plain_roi_stack)
+        elif self._interpolator.can_interpolate(weight['interpolation_weight']):
+            return weight
+        else:
+            return record.ResamplingWeight(
+                stride = weight['stride'],
+                row_range = weight['row_range'],
+                plain_mask = weight['plain_mask'],
+                interpolation_weight = self._interpolator.build_weight(
+                    weight['interpolation_weight']['grid_index']),
+            )
+    
+    def _restrict_weight(
+        self, weight: record.ResamplingWeight, plain_roi_stack: np.ndarray,
+    ) -> record.ResamplingWeight:
+        # Grid index is in the same order as the plain mask, so its rows in
+        # the region of interest can be picked out without rebuilding it
+        plain_roi_stack = self._build_plain_roi_stack(
+            plain_roi_stack, weight['stride'], weight['row_range'])
+        is_kept = plain_roi_stack[weight['plain_mask']]
+        return record.ResamplingWeight(
+            stride = weight['stride'],
+            row_range = weight['row_range'],
+            plain_mask = weight['plain_mask'] & plain_roi_stack,
+            interpolation_weight = self._interpolator.build_weight(
+                weight['interpolation_weight']['grid_index'][is_kept]),
+        )
+    
+    def resample_by_weight(
+        self,
+        weight: record.ResamplingWeight,
+        plain_pixel_data_stack: np.ndarray,
+    ) -> None:
+        # Only the rows covered by the weight are written, so that tiles can
+        # be resampled concurrently into the same output
+        if np.any(weight['plain_mask']):  # Planes missing the grid stay empty
+            plain_pixel_data_tile = plain_pixel_data_stack[
+                :, slice(*weight['row_range'])]
+            plain_pixel_data_tile[weight['plain_mask']] = self._interpolator.interpolate(
+                weight['interpolation_weight'])
+    
+    def upscale(
+        self, plain_pixel_data_stack: np.ndarray, stride: int = 1) -> np.ndarray:
+        # Each sampled pixel fills the stride*stride block it starts, where
+        # blocks at the far edges are cropped to the plain size
+        if stride == 1:
+            return plain_pixel_data_stack
+        plain_pixel_data_stack = np.repeat(
+            plain_pixel_data_stack, stride, axis=1)
+        plain_pixel_data_stack = np.repeat(
+            plain_pixel_data_stack, stride, axis=2)
+        return np.ascontiguousarray(
+            plain_pixel_data_stack[:, :self._plain_size[0], :self._plain_size[1]])
+    
+    def is_geometry_shared(self, other: ResamplerABC) -> bool:
+        return (
+            self._plain_size == other._plain_size
+            and self._grid_size == other._grid_size
+            and np.array_equal(
+                self._grid_affine_inversed, other._grid_affine_inversed)
+        )
+    
+    def _build_plain_to_grid_affine(
+        self, plain_affine_stack: np.ndarray) -> np.ndarray:
+        return matrix_utils.cast(self._grid_affine_inversed @ plain_affine_stack)
+    
+    def _build_plain_mask(
+        self,
+        plain_to_grid_affine: np.ndarray,
+        plain_axis_index_pair: tuple[np.ndarray, np.ndarray],
+    ) -> np.ndarray:
+        # Grid index of the point (x, y) in the plain is
+        # origin + x*axis_x + y*axis_y. The plain intersects the grid in a
+        # convex polygon, which is found row by row by solving
+        # 0 <= origin + x*axis_x + y*axis_y <= grid_size-1 for y on each axis.
+        # The output has the shape of (plain_number, *plain_size) for stride 1
+        origin = plain_to_grid_affine[:, np.newaxis, :3, 3]
+        axis_x = plain_to_grid_affine[:, np.newaxis, :3, 0]
+        axis_y = plain_to_grid_affine[:, np.newaxis, :3, 1]
+        index_x, index_y = plain_axis_index_pair
+        row_origin = origin + index_x[:, np.newaxis] * axis_x
+        lower_bound = -CULLING_TOLERANCE - row_origin
+        upper_bound = np.subtract(self._grid_size, 1) + CULLING_TOLERANCE - row_origin
+        is_row_inside = (lower_bound <= 0) & (upper_bound >= 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y_bound_pair = (lower_bound / axis_y, upper_bound / axis_y)
+        y_lower = np.where(
+            axis_y != 0,
+            np.minimum(*y_bound_pair),
+            np.where(is_row_inside, -np.inf, np.inf),
+        )
+        y_upper = np.where(
+            axis_y != 0,
+            np.maximum(*y_bound_pair),
+            np.where(is_row_inside, np.inf, -np.inf),
+        )
+        y_lower = np.amax(y_lower, axis=-1)[..., np.newaxis]
+        y_upper = np.amin(y_upper, axis=-1)[..., np.newaxis]
+        return (index_y >= y_lower) & (index_y <= y_upper)
+    
+    def _build_grid_index(
+        self,
+        plain_to_grid_affine: np.ndarray,
+        plain_axis_index_pair: tuple[np.ndarray, np.ndarray],
+        plain_mask: np.ndarray,
+    ) -> np.ndarray:
+        # Grid index is only built for pixels in the plain mask and looks like
         # [
-        #   [x_1, y_1, z_1],
-        #   [x_2, y_2, z_2],
-        #   [x_3, y_3, z_3],
+        #   [i_1, j_1, k_1],
+        #   [i_2, j_2, k_2],
         #   ...
         # ]
-        self, grid_index: np.ndarray) -> np.ndarray:
-        plain_point = grid_index[:3, :]
-        plain_point = np.transpose(plain_point)
-        return plain_point
+        # in the same order as plain_pixel_data_stack[plain_mask]
+        plain_index, x, y = np.nonzero(plain_mask)
+        index_x, index_y = plain_axis_index_pair
+        return (
+            plain_to_grid_affine[plain_index, :3, 3]
+            + index_x[x, np.newaxis] * plain_to_grid_affine[plain_index, :3, 0]
+            + index_y[y, np.newaxis] * plain_to_grid_affine[plain_index, :3, 1]
+        )
 
 
 class Body3DResampler(ResamplerABC):
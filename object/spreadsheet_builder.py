@@ -7,9 +7,13 @@ Created: Weixun Luo
 Date: 07/04/2023
 """
 from __future__ import annotations
+from concurrent import futures
+import hashlib
 import itertools
+import multiprocessing
 import typing
 
+import orjson
 import pandas as pd
 
 from object import record
@@ -18,6 +22,15 @@ from utils import io_utils
 from utils import path_utils
 
 
+DISCOVERY_WORKER_NUMBER = 8  # Case directories searched concurrently
+DISCOVERY_EXECUTOR_TYPE = 'thread'  # Either 'thread' or 'process'
+PROCESS_START_METHOD = (  # Workers never inherit locks held by other threads
+    'forkserver'
+    if 'forkserver' in multiprocessing.get_all_start_methods()
+    else 'spawn'
+)
+MANIFEST_DIRECTORY_KEY_SEQUENCE = ('body', 'organ', 'slice', 'slice_mask')
+
 DataFrameGenerator: typing.TypeAlias = typing.Generator[pd.DataFrame, None, None]
 StrSequence: typing.TypeAlias = tuple[str, ...]
 
@@ -26,22 +39,176 @@ class DatasetSpreadsheetBuilder:
     """Tool to build a dataset spreadsheet.
 
     An object used to build the dataframe that can describe
-    the given dataset.
+    the given dataset. Image headers are read once per file
+    and memoised while building each case, since slices are
+    sorted and grouped by their affines several times. Cases
+    are built concurrently since searching directories and
+    reading headers is bound by the latency of the file
+    system. Workers are only sent the configuration and the
+    case directory path, so that building on processes does
+    not pickle the builder and its growing manifest.
+
+    Given the manifest of a previous build, cases are reused
+    unless any of their input directories has been modified
+    since, so only new and changed cases are built again.
     """
 
-    def __init__(self, configuration: record.Configuration) -> None:
+    def __init__(
+        self,
+        configuration: record.Configuration,
+        discovery_worker_number: int = DISCOVERY_WORKER_NUMBER,
+        discovery_executor_type: str = DISCOVERY_EXECUTOR_TYPE,
+    ) -> None:
         self._configuration = configuration
+        self._discovery_worker_number = discovery_worker_number
+        self._discovery_executor_type = discovery_executor_type
+        self._header_map = {}
+        self._completed_case_number = 0
+        self._total_case_number = 0
+        self._manifest = None
+    
+    def build_spreadsheet(
+        self, manifest: record.DatasetManifest | None = None) -> pd.DataFrame:
+        return pd.concat(
+            tuple(self.build_case_iterable(manifest)), ignore_index=True)
+    
+    def build_case_iterable(
+        self, manifest: record.DatasetManifest | None = None,
+    ) -> DataFrameGenerator:
+        """Builds cases one by one in the order of their directories.
+        
+        Each case is yielded as soon as it and the cases before
+        it are built, while the following cases are still being
+        built in the background. The manifest is complete once
+        the iterable is exhausted.
+        """
+        self._header_map = {}
+        self._manifest = record.DatasetManifest(
+            configuration_hash = self._build_configuration_hash(),
+            case_map = {},
+        )
+        return self._build_case_iterable(self._extract_case_map(manifest))
+    
+    def _build_configuration_hash(self) -> str:
+        # Only fields affecting the spreadsheet are hashed
+        content = orjson.dumps(
+            {
+                key: self._configuration[key]
+                for key in ('dataset_directory_path', 'directory_name',
+                            'file_name', 'pattern', 'tag')
+            },
+            option = orjson.OPT_SORT_KEYS,
+        )
+        return hashlib.sha1(content).hexdigest()
+    
+    def _extract_case_map(
+        self, manifest: record.DatasetManifest | None,
+    ) -> dict[str, record.DatasetManifestCase]:
+        if (
+            manifest is None
+            or manifest.get('configuration_hash')
+                != self._manifest['configuration_hash']
+        ):
+            return {}
+        else:
+            return manifest['case_map']
+    
+    @property
+    def manifest(self) -> record.DatasetManifest | None:
+        return self._get_manifest_by_property()
+    
+    def _get_manifest_by_property(self) -> record.DatasetManifest | None:
+        return self._manifest
     
-    def build_spreadsheet(self) -> pd.DataFrame:
-        return pd.concat(self._build_case_iterable(), ignore_index=True)
+    @property
+    def progress(self) -> record.ProgressStatistics:
+        return self._get_progress_by_property()
+    
+    def _get_progress_by_property(self) -> record.ProgressStatistics:
+        return record.ProgressStatistics(
+            completed_number = self._completed_case_number,
+            total_number = self._total_case_number,
+            failure_message = None,
+        )
+    
+    def _read_header(self, file_path: str) -> record.ImageHeader:
+        if file_path not in self._header_map:
+            self._header_map[file_path] = io_utils.read_header(file_path)
+        return self._header_map[file_path]
 
-    def _build_case_iterable(self) -> DataFrameGenerator:
-        return (
-            self._build_case(case_directory_path)
-            for case_directory_path
-            in self._build_case_directory_path_sequence()
+    def _build_case_iterable(
+        self, case_map: dict[str, record.DatasetManifestCase],
+    ) -> DataFrameGenerator:
+        case_directory_path_sequence = self._build_case_directory_path_sequence()
+        self._completed_case_number = 0
+        self._total_case_number = len(case_directory_path_sequence)
+        executor = self._construct_discovery_executor()
+        try:
+            # Modification times are checked by the workers as well, so the
+            # first case is yielded without visiting every case directory
+            future_map = {
+                case_directory_path: executor.submit(
+                    _build_case_in_worker,
+                    self._configuration,
+                    case_directory_path,
+                    self._extract_modification_time(
+                        case_map, case_directory_path),
+                )
+                for case_directory_path in case_directory_path_sequence
+            }
+            # Cases are yielded in the order of their directories whatever
+            # order they are completed in
+            for case_directory_path in case_directory_path_sequence:
+                modification_time, case = future_map[case_directory_path].result()
+                if case is None:
+                    case = pd.DataFrame(case_map[case_directory_path]['row_map'])
+                self._completed_case_number += 1
+                self._manifest['case_map'][case_directory_path] = (
+                    record.DatasetManifestCase(
+                        modification_time = modification_time,
+                        row_map = case.to_dict('list'),
+                    )
+                )
+                yield case
+        finally:
+            # Cases not started yet are dropped if the iterable is closed early
+            executor.shutdown(cancel_futures=True)
+    
+    def _build_modification_time(self, case_directory_path: str) -> int:
+        # The case directory itself is excluded as transformation spreadsheets
+        # are saved there
+        return max(
+            path_utils.extract_modification_time(
+                f'{case_directory_path}/{self._configuration["directory_name"][key]}')
+            for key in MANIFEST_DIRECTORY_KEY_SEQUENCE
         )
     
+    def _extract_modification_time(
+        self,
+        case_map: dict[str, record.DatasetManifestCase],
+        case_directory_path: str,
+    ) -> int | None:
+        if case_directory_path in case_map:
+            return case_map[case_directory_path]['modification_time']
+        else:
+            return None
+    
+    def _construct_discovery_executor(self) -> futures.Executor:
+        match self._discovery_executor_type:
+            case 'thread':
+                return futures.ThreadPoolExecutor(
+                    self._discovery_worker_number,
+                    thread_name_prefix = 'discovery',
+                )
+            case 'process':
+                return futures.ProcessPoolExecutor(
+                    self._discovery_worker_number,
+                    mp_context = multiprocessing.get_context(PROCESS_START_METHOD),
+                )
+            case _:
+                raise ValueError(
+                    f'Unsupported executor type: {self._discovery_executor_type}')
+    
     def _build_case(self, case_directory_path: str) -> pd.DataFrame:
         return pd.concat(
             self._build_subcase_iterable(case_directory_path),
@@ -277,7 +444,7 @@ class DatasetSpreadsheetBuilder:
     
     def _extract_axis_z(
         self, slice_file_path: str) -> tuple[float, float, float]:
-        affine = io_utils.read_affine(slice_file_path)
+        affine = self._read_header(slice_file_path)['affine']
         axis_z = affine_utils.extract_axis(affine, 'z')
         return axis_z
     
@@ -299,7 +466,7 @@ class DatasetSpreadsheetBuilder:
     
     def _extract_origin_z(
         self, slice_file_path: str) -> float:
-        affine = io_utils.read_affine(slice_file_path)
+        affine = self._read_header(slice_file_path)['affine']
         origin_z = -1 * affine[2, 3]  # This ensures that the first slice is at the top
         return origin_z
 
@@ -334,4 +501,20 @@ class DatasetSpreadsheetBuilder:
 
     def _build_case_directory_path_sequence(self) -> StrSequence:
         return path_utils.list_subdirectory(
-            self._configuration['dataset_directory_path'])
\ No newline at end of file
+            self._configuration['dataset_directory_path'])
+
+
+# ----- Discovery Worker -----
+def _build_case_in_worker(
+    configuration: record.Configuration,
+    case_directory_path: str,
+    manifest_modification_time: int | None,
+) -> tuple[int, pd.DataFrame | None]:
+    # Each case is built by a builder of its own, which memoises the headers
+    # of the case only. No case is built if it is unchanged since the manifest
+    builder = DatasetSpreadsheetBuilder(configuration)
+    modification_time = builder._build_modification_time(case_directory_path)
+    if modification_time == manifest_modification_time:
+        return modification_time, None
+    else:
+        return modification_time, builder._build_case(case_directory_path)
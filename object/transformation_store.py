@@ -0,0 +1,141 @@
+"""Transformation Store.
+
+This module contains the implementation of transformation
+stores used in the application. Transformation store is a
+tool that can keep transformations of all cases in a
+dataset in a single SQLite table indexed by case ID and
+slice ID, as an alternative to per-case spreadsheets.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+import contextlib
+import os
+import sqlite3
+import typing
+
+import numpy as np
+import pandas as pd
+
+from utils import io_utils
+
+
+PARAMETER_COLUMN_SEQUENCE = (
+    'translation_x', 'translation_y', 'translation_z',
+    'rotation_x', 'rotation_y', 'rotation_z',
+    'scale_x', 'scale_y', 'scale_z',
+    'skew_x', 'skew_y', 'skew_z',
+)
+KEY_COLUMN_SEQUENCE = ('case_id', 'slice_id')
+TABLE_NAME = 'transformation'
+TIMEOUT = 30.0  # Seconds waiting for other connections to release the file
+
+
+class TransformationStore:
+    """Store of transformations of a dataset.
+
+    An object that reads and upserts transformations of any
+    number of cases at once in a single SQLite file. Content
+    follows the layout of transformation spreadsheets, where
+    parameter columns not stored are dropped when reading.
+    Transformation spreadsheets can be imported and exported
+    in bulk. A connection is opened for each operation, so
+    that the store can be used from any thread.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self._file_path = file_path
+        self._create_table()
+
+    @property
+    def file_path(self) -> str:
+        return self._get_file_path_by_property()
+    
+    def _get_file_path_by_property(self) -> str:
+        return self._file_path
+
+    def _connect(self) -> contextlib.closing[sqlite3.Connection]:
+        return contextlib.closing(
+            sqlite3.connect(self._file_path, timeout=TIMEOUT))
+
+    def _create_table(self) -> None:
+        column_definition = ', '.join((
+            *(f'{column} TEXT NOT NULL' for column in KEY_COLUMN_SEQUENCE),
+            *(f'{column} REAL' for column in PARAMETER_COLUMN_SEQUENCE),
+            f'PRIMARY KEY ({", ".join(KEY_COLUMN_SEQUENCE)})',
+        ))
+        with self._connect() as connection, connection:
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {TABLE_NAME} '
+                f'({column_definition}) WITHOUT ROWID'
+            )
+
+    def contain(self, case_id: str) -> bool:
+        with self._connect() as connection:
+            return connection.execute(
+                f'SELECT 1 FROM {TABLE_NAME} WHERE case_id = ? LIMIT 1',
+                (case_id,),
+            ).fetchone() is not None
+
+    def read(self, case_id: str | None = None) -> pd.DataFrame:
+        """Reads a case, or all cases if no case ID is given."""
+        with self._connect() as connection:
+            if case_id is None:
+                content = pd.read_sql_query(
+                    f'SELECT * FROM {TABLE_NAME}', connection)
+            else:
+                content = pd.read_sql_query(
+                    f'SELECT * FROM {TABLE_NAME} WHERE case_id = ?',
+                    connection,
+                    params = (case_id,),
+                )
+        return content.dropna(axis=1, how='all')
+
+    def upsert(self, content: pd.DataFrame) -> None:
+        """Inserts rows, or replaces them if their keys exist."""
+        column_sequence = self._validate_column_sequence(tuple(content.columns))
+        with self._connect() as connection, connection:
+            connection.executemany(
+                f'INSERT OR REPLACE INTO {TABLE_NAME} '
+                f'({", ".join(column_sequence)}) '
+                f'VALUES ({", ".join("?" * len(column_sequence))})',
+                self._build_row_iterable(content),
+            )
+
+    def _build_row_iterable(
+        self, content: pd.DataFrame) -> typing.Iterator[tuple]:
+        # NumPy scalars such as float32 can not be bound by SQLite
+        for row in content.itertuples(index=False, name=None):
+            yield tuple(
+                value.item() if isinstance(value, np.generic) else value
+                for value in row
+            )
+
+    def _validate_column_sequence(
+        self, column_sequence: tuple[str, ...]) -> tuple[str, ...]:
+        for column in column_sequence:
+            if column not in (*KEY_COLUMN_SEQUENCE, *PARAMETER_COLUMN_SEQUENCE):
+                raise ValueError(f'Unsupported column: {column}')
+        return column_sequence
+
+    def import_spreadsheet(
+        self, file_path_sequence: typing.Iterable[str]) -> None:
+        """Upserts existing spreadsheets in a single transaction."""
+        content_sequence = tuple(
+            io_utils.read_file(file_path)
+            for file_path in file_path_sequence
+            if os.path.isfile(file_path)
+        )
+        if len(content_sequence) != 0:
+            self.upsert(pd.concat(content_sequence, ignore_index=True))
+
+    def export_spreadsheet(self, file_path_map: dict[str, str]) -> None:
+        """Writes stored cases to spreadsheets mapped by case ID."""
+        content = self.read()
+        for case_id, case_content in content.groupby('case_id', sort=False):
+            if case_id in file_path_map:
+                io_utils.write_file(
+                    case_content.dropna(axis=1, how='all'),
+                    file_path_map[case_id],
+                )
@@ -10,20 +10,29 @@ Created by: Weixun Luo
 Date: 08/04/2023
 """
 from __future__ import annotations
+from concurrent import futures
+import os
+import time
 import typing
 
 import pandas as pd
 
+from object import image_cache
+from object import journal
 from object import record
+from object.image import image_abstract
 from object.image import image_concrete
 from object import transformation
+from object import transformation_store
 from persistence_layer import data_accessor_plugin
 from utils import io_utils
 
 
 TRANSFORMATION_TYPE = transformation.RigidTransformation
+IO_THREAD_NUMBER = 8  # Files of a case are loaded concurrently on a shared thread pool
 
 Initialiser: typing.TypeAlias = record.DataAccessorInitialiser
+ImageKey: typing.TypeAlias = tuple[type[image_abstract.ImageABC], str]
 
 
 class DataAccessor(
@@ -41,10 +50,31 @@ class DataAccessor(
     An object that contains data used for each case and
     specifically designed interfaces, which offer efficient
     and accurate data access to corresponding components in
-    the application.
+    the application. Given an I/O thread pool, all image
+    files of a case are loaded concurrently, since reading
+    and decompressing files release the GIL.
+
+    The transformation spreadsheet and each resampled organ
+    are flagged dirty when they are missing on disk or their
+    transformations change, so that saving only rewrites
+    files out of date.
+
+    Changed transformations are also appended to a journal
+    next to the transformation spreadsheet, which is replayed
+    when the case is set up again and compacted once the
+    spreadsheet is written, so that unsaved changes survive
+    crashes and closed browsers.
+
+    Given a transformation store, transformations are read
+    from and written to the store instead, falling back to
+    the spreadsheet for cases not stored yet, which are then
+    imported into the store when they are saved.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self, io_thread_pool: futures.ThreadPoolExecutor | None = None) -> None:
+        self._io_thread_pool = io_thread_pool
+        self._load_time_map = None
         self._case_id = None
         self._body = None
         self._body_resampled_map = None
@@ -55,30 +85,125 @@ class DataAccessor(
         self._slice_mask_map = None
         self._transformation_map = None
         self._transformation_spreadsheet_file_path = None
+        self._transformation_store = None
+        self._is_transformation_spreadsheet_dirty = None
+        self._organ_resampled_dirty_slice_id_set = None
+        self._transformation_journal = None
+        self._image_cache = None
     
     def set_up(self, initialiser: Initialiser) -> None:
         self._case_id = self._construct_case_id(initialiser)
-        self._body = self._construct_body(initialiser)
+        self._image_cache = self._construct_image_cache(initialiser)
+        self._transformation_store = self._construct_transformation_store(
+            initialiser)
+        image_map = self._load_image_map(initialiser)
+        self._body = self._construct_body(initialiser, image_map)
         self._body_resampled_map = self._construct_body_resampled_map(
             initialiser)
-        self._organ = self._construct_organ(initialiser)
+        self._organ = self._construct_organ(initialiser, image_map)
         self._organ_resampled_map = self._construct_organ_resampled_map(
             initialiser)
         self._organ_resampled_file_path_map = self._construct_organ_resampled_file_path_map(
             initialiser)
-        self._slice_map = self._construct_slice_map(initialiser)
-        self._slice_mask_map = self._construct_slice_mask_map(initialiser)
+        self._slice_map = self._construct_slice_map(initialiser, image_map)
+        self._slice_mask_map = self._construct_slice_mask_map(
+            initialiser, image_map)
         self._transformation_map = self._construct_transformation_map(
             initialiser) 
         self._transformation_spreadsheet_file_path = self._construct_transformation_spreadsheet_file_path(
             initialiser)
+        self._is_transformation_spreadsheet_dirty = self._construct_is_transformation_spreadsheet_dirty(
+            initialiser)
+        self._organ_resampled_dirty_slice_id_set = self._construct_organ_resampled_dirty_slice_id_set(
+            initialiser)
+        self._transformation_journal = self._construct_transformation_journal(
+            initialiser)
+        self._replay_transformation_journal()
+
+    def close(self) -> None:
+        """Releases files kept open, which are reopened when needed."""
+        if self._transformation_journal is not None:
+            self._transformation_journal.close()
 
     def _construct_case_id(self, initialiser: Initialiser) -> str:
         return initialiser['case_id']
     
+    def _construct_image_cache(
+        self, initialiser: Initialiser) -> image_cache.ImageCache | None:
+        if initialiser['cache_directory_path'] is None:
+            return None
+        else:
+            return image_cache.ImageCache(initialiser['cache_directory_path'])
+    
+    def _construct_transformation_store(
+        self, initialiser: Initialiser,
+    ) -> transformation_store.TransformationStore | None:
+        if initialiser['transformation_store_file_path'] is None:
+            return None
+        else:
+            return transformation_store.TransformationStore(
+                initialiser['transformation_store_file_path'])
+    
+    def _load_image_map(
+        self, initialiser: Initialiser,
+    ) -> dict[ImageKey, image_abstract.ImageABC]:
+        image_key_sequence = self._build_image_key_sequence(initialiser)
+        if self._io_thread_pool is None:
+            image_time_pair_sequence = tuple(
+                self._load_image(*image_key)
+                for image_key in image_key_sequence
+            )
+        else:
+            future_sequence = tuple(
+                self._io_thread_pool.submit(self._load_image, *image_key)
+                for image_key in image_key_sequence
+            )
+            image_time_pair_sequence = tuple(
+                future.result() for future in future_sequence)
+        # Load time is measured in seconds for each image type and file
+        self._load_time_map = {
+            (image_type.__name__, file_path): load_time
+            for (image_type, file_path), (_, load_time)
+            in zip(image_key_sequence, image_time_pair_sequence)
+        }
+        return {
+            image_key: image
+            for image_key, (image, _)
+            in zip(image_key_sequence, image_time_pair_sequence)
+        }
+    
+    def _build_image_key_sequence(
+        self, initialiser: Initialiser) -> tuple[ImageKey, ...]:
+        # Files are keyed by their image types as well, since slices and their
+        # default masks share the same files
+        return tuple(dict.fromkeys((
+            (image_concrete.Body3D, initialiser['body_file_path']),
+            (image_concrete.Organ3D, initialiser['organ_file_path']),
+            *(
+                (image_concrete.Slice2D, slice_file_path)
+                for slice_file_path
+                in initialiser['slice_file_path_map'].values()
+            ),
+            *(
+                (image_concrete.SliceMask2D, slice_mask_file_path)
+                for slice_mask_file_path
+                in initialiser['slice_mask_file_path_map'].values()
+            ),
+        )))
+    
+    def _load_image(
+        self, image_type: type[image_abstract.ImageABC], file_path: str,
+    ) -> tuple[image_abstract.ImageABC, float]:
+        start_time = time.perf_counter()
+        image = image_type(file_path, self._image_cache)
+        return image, time.perf_counter() - start_time
+    
     def _construct_body(
-        self, initialiser: Initialiser) -> image_concrete.Body3D:
-        return image_concrete.Body3D(initialiser['body_file_path'])
+        self,
+        initialiser: Initialiser,
+        image_map: dict[ImageKey, image_abstract.ImageABC],
+    ) -> image_concrete.Body3D:
+        return image_map[(image_concrete.Body3D, initialiser['body_file_path'])]
     
     def _construct_body_resampled_map(
         self, initialiser: Initialiser) -> dict[str, image_concrete.BodyResampled2D]:
@@ -88,8 +213,11 @@ class DataAccessor(
         }
     
     def _construct_organ(
-        self, initialiser: Initialiser) -> image_concrete.Organ3D:
-        return image_concrete.Organ3D(initialiser['organ_file_path'])
+        self,
+        initialiser: Initialiser,
+        image_map: dict[ImageKey, image_abstract.ImageABC],
+    ) -> image_concrete.Organ3D:
+        return image_map[(image_concrete.Organ3D, initialiser['organ_file_path'])]
     
     def _construct_organ_resampled_map(
         self, initialiser: Initialiser,
@@ -104,18 +232,23 @@ class DataAccessor(
         return dict(initialiser['organ_resampled_file_path_map'])
     
     def _construct_slice_map(
-        self, initialiser: Initialiser) -> dict[str, image_concrete.Slice2D]:
+        self,
+        initialiser: Initialiser,
+        image_map: dict[ImageKey, image_abstract.ImageABC],
+    ) -> dict[str, image_concrete.Slice2D]:
         return {
-            slice_id: image_concrete.Slice2D(slice_file_path)
+            slice_id: image_map[(image_concrete.Slice2D, slice_file_path)]
             for slice_id, slice_file_path
             in initialiser['slice_file_path_map'].items()
         }
     
     def _construct_slice_mask_map(
-        self, initialiser: Initialiser,
+        self,
+        initialiser: Initialiser,
+        image_map: dict[ImageKey, image_abstract.ImageABC],
     ) -> dict[str, image_concrete.SliceMask2D]:
         return {
-            slice_id: image_concrete.SliceMask2D(slice_mask_file_path)
+            slice_id: image_map[(image_concrete.SliceMask2D, slice_mask_file_path)]
             for slice_id, slice_mask_file_path
             in initialiser['slice_mask_file_path_map'].items()
         }
@@ -139,8 +272,14 @@ class DataAccessor(
     
     def _read_transformation_spreadsheet(
         self, initialiser: Initialiser) -> pd.DataFrame:
-        return io_utils.read_file(
-            initialiser['transformation_spreadsheet_file_path'])
+        if (
+            self._transformation_store is not None
+            and self._transformation_store.contain(initialiser['case_id'])
+        ):
+            return self._transformation_store.read(initialiser['case_id'])
+        else:
+            return io_utils.read_file(
+                initialiser['transformation_spreadsheet_file_path'])
     
     def _build_transformation_map(
         self,
@@ -182,4 +321,62 @@ class DataAccessor(
     
     def _construct_transformation_spreadsheet_file_path(
         self, initialiser: Initialiser) -> str:
-        return initialiser['transformation_spreadsheet_file_path']
\ No newline at end of file
+        return initialiser['transformation_spreadsheet_file_path']
+    
+    def _construct_is_transformation_spreadsheet_dirty(
+        self, initialiser: Initialiser) -> bool:
+        if self._transformation_store is not None:
+            return not self._transformation_store.contain(
+                initialiser['case_id'])
+        else:
+            return not os.path.isfile(
+                initialiser['transformation_spreadsheet_file_path'])
+    
+    def _construct_transformation_journal(
+        self, initialiser: Initialiser) -> journal.TransformationJournal:
+        return journal.open_transformation_journal(
+            f'{initialiser["transformation_spreadsheet_file_path"]}.journal',
+            tuple(initialiser['slice_file_path_map']),
+        )
+    
+    def _replay_transformation_journal(self) -> None:
+        # Transformations left unsaved override those in the spreadsheet
+        for slice_id, parameter in self._transformation_journal.replay().items():
+            if slice_id not in self._transformation_map:
+                continue  # Journaled for another load of the case
+            self._transformation_map[slice_id] = TRANSFORMATION_TYPE(parameter)
+            self._is_transformation_spreadsheet_dirty = True
+            self._organ_resampled_dirty_slice_id_set.add(slice_id)
+    
+    def _construct_organ_resampled_dirty_slice_id_set(
+        self, initialiser: Initialiser) -> set[str]:
+        return {
+            slice_id
+            for slice_id, organ_resampled_file_path
+            in initialiser['organ_resampled_file_path_map'].items()
+            if not os.path.isfile(organ_resampled_file_path)
+        }
+    
+    @property
+    def load_time_map(self) -> dict[tuple[str, str], float]:
+        return self._get_load_time_map_by_property()
+    
+    def _get_load_time_map_by_property(self) -> dict[tuple[str, str], float]:
+        return self._load_time_map
+    
+    @property
+    def nbyte(self) -> int:
+        return self._get_nbyte_by_property()
+    
+    def _get_nbyte_by_property(self) -> int:
+        return sum(
+            image.nbyte
+            for image in (
+                self._body,
+                self._organ,
+                *self._body_resampled_map.values(),
+                *self._organ_resampled_map.values(),
+                *self._slice_map.values(),
+                *self._slice_mask_map.values(),
+            )
+        )
\ No newline at end of file
@@ -9,6 +9,7 @@ Created by: Weixun Luo
 Date: 10/04/2023
 """
 from __future__ import annotations
+import functools
 
 import numpy as np
 
@@ -93,6 +94,15 @@ class TransformationProcessingUnitPlugin:
         slice_id: str,
         transformation: transformation.TransformationABC,
     ) -> None:
+        # Resampled organs follow transformations, so both are marked dirty
+        if not np.array_equal(
+            self._transformation_map[slice_id].parameter,
+            transformation.parameter,
+        ):
+            self._is_transformation_spreadsheet_dirty = True
+            self._organ_resampled_dirty_slice_id_set.add(slice_id)
+            self._transformation_journal.append(
+                slice_id, transformation.parameter)
         self._transformation_map[slice_id] = transformation
 
 class VisualisationProcessingUnitPlugin:
@@ -133,12 +143,36 @@ class ResamplingProcessingUnitPlugin:
             grid_affine = self._organ.affine_original,
         )
     
-    def get_resample_body_kwargs(self, slice_id: str) -> dict[str, np.ndarray]:
-        return {'plain_affine':self._slice_map[slice_id].affine_current}
+    def get_resample_kwargs(
+        self, slice_id: str, is_roi_resampling: bool) -> dict:
+        # Slice masks are only copied in ROI mode
+        return {
+            'slice_id': slice_id,
+            'plain_affine': self._slice_map[slice_id].affine_current,
+            'plain_roi':
+                self._slice_mask_map[slice_id].pixel_data
+                if is_roi_resampling
+                else None,
+        }
+
+    def get_resample_batch_kwargs(
+        self, slice_id_sequence: tuple[str, ...], is_roi_resampling: bool,
+    ) -> dict:
+        return {
+            'slice_id_sequence': slice_id_sequence,
+            'plain_affine_stack': np.stack(tuple(
+                self._slice_map[slice_id].affine_current
+                for slice_id in slice_id_sequence
+            )),
+            'plain_roi_stack':
+                np.stack(tuple(
+                    self._slice_mask_map[slice_id].pixel_data
+                    for slice_id in slice_id_sequence
+                ))
+                if is_roi_resampling
+                else None,
+        }
 
-    def get_resample_organ_kwargs(self, slice_id: str) -> dict[str, np.ndarray]:
-        return {'plain_affine':self._slice_map[slice_id].affine_current}
-    
     def update_body_resampled(
         self, slice_id: str, pixel_data: np.ndarray) -> None:
         self._body_resampled_map[slice_id].pixel_data = pixel_data
@@ -209,6 +243,7 @@ class IOProcessingUnitPlugin:
 
     def get_write_transformation_spreadsheet_kwargs(self) -> dict:
         return {
+            'is_dirty': self._is_transformation_spreadsheet_dirty,
             'case_id': self._case_id,
             'slice_id_sequence': tuple(self._transformation_map.keys()),
             'transformation_parameter_matrix': matrix_utils.build_from_iterable(
@@ -220,21 +255,57 @@ class IOProcessingUnitPlugin:
                 element_length = 6, # This is currently hard-coded to rigid transformations
             ),
             'file_path': self._transformation_spreadsheet_file_path,
+            'transformation_store': self._transformation_store,
+            # Records journaled so far are saved once the spreadsheet is written
+            'on_written': functools.partial(
+                self._transformation_journal.compact,
+                self._transformation_journal.record_number,
+            ),
+            'on_failed': self._set_transformation_spreadsheet_dirty_flag,
         }
     
     def get_write_organ_resampled_map_kwargs(self) -> dict:
+        # Only dirty slices are included, so that unchanged ones are skipped.
+        # Failed writes may add slices from writer threads, so the set is
+        # copied first
+        dirty_slice_id_sequence = tuple(self._organ_resampled_dirty_slice_id_set)
         return {
             'pixel_data_map': {
-                slice_id: organ_resampled.pixel_data
-                for slice_id, organ_resampled
-                in self._organ_resampled_map.items()
+                slice_id: self._freeze(
+                    self._organ_resampled_map[slice_id].pixel_data)
+                for slice_id in dirty_slice_id_sequence
             },
             'affine_map': {
-                slice_id: slice.affine_current
-                for slice_id, slice in self._slice_map.items()
+                slice_id: self._freeze(self._slice_map[slice_id].affine_current)
+                for slice_id in dirty_slice_id_sequence
+            },
+            'file_path_map': {
+                slice_id: self._organ_resampled_file_path_map[slice_id]
+                for slice_id in dirty_slice_id_sequence
             },
-            'file_path_map': self._organ_resampled_file_path_map,
+            'on_failed': self._set_organ_resampled_dirty_flag,
         }
+    
+    def _freeze(self, array: np.ndarray) -> np.ndarray:
+        # Getters already return copies, which are made read-only so that
+        # they are shared instead of copied again when written behind
+        array.setflags(write=False)
+        return array
+    
+    def _set_transformation_spreadsheet_dirty_flag(self) -> None:
+        self._is_transformation_spreadsheet_dirty = True
+    
+    def _set_organ_resampled_dirty_flag(self, slice_id: str) -> None:
+        self._organ_resampled_dirty_slice_id_set.add(slice_id)
+    
+    def clear_dirty_flag(self) -> None:
+        """Marks everything saved, which must happen before writes are queued."""
+        self._is_transformation_spreadsheet_dirty = False
+        self._organ_resampled_dirty_slice_id_set = set()
+    
+    def set_dirty_flag(self) -> None:
+        self._is_transformation_spreadsheet_dirty = True
+        self._organ_resampled_dirty_slice_id_set = set(self._organ_resampled_map)
 
 class AppFactoryPlugin:
     """Interface designed for App Factory."""
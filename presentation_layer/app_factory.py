@@ -8,6 +8,7 @@ Created by: Weixun Luo
 Date: 15/04/2023
 """
 from __future__ import annotations
+from concurrent import futures
 
 import dash_bootstrap_components as dbc
 
@@ -54,8 +55,13 @@ class AppFactory(
         self._plotting_processing_unit = plotting_processing_unit.PlottingProcessingUnit()
         self._evaluation_processing_unit = evaluation_processing_unit.EvaluationProcessingUnit()
         self._io_processing_unit = io_processing_unit.IOProcessingUnit()
+        self._io_thread_pool = futures.ThreadPoolExecutor(
+            data_accessor.IO_THREAD_NUMBER, thread_name_prefix='io')
         self._data_accessor = data_accessor.DataAccessor()
-        self._dataset = dataset.Dataset()
+        self._dataset = dataset.Dataset(
+            self._load_case, self._measure_case, self._close_case)
+        self._is_previewing = False
+        self._preview_update_backend_kwargs = None
 
     def build_app_layout(
         self, configuration_file_path: str | None) -> dbc.Container:
@@ -65,6 +71,8 @@ class AppFactory(
                 self._build_home_page(configuration_file_path),
                 self._build_main_page(),
                 widget_utils.build_keyboard_listener(id.keyboard_id),
+                widget_utils.build_keyboard_release_listener(
+                    id.keyboard_release_id),
             ),
             fluid = True,
         )
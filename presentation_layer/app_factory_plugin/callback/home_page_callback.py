@@ -30,6 +30,8 @@ class HomePageCallbackPlugin:
                 },
                 'open_invalid_configuration_file_error_modal':
                     dash.Output(id.invalid_configuration_file_error_modal_id, 'is_open'),
+                'disable_indexing_progress_interval':
+                    dash.Output(id.indexing_progress_interval_id, 'disabled'),
             },
             {
                 'configuration': dash.Input(id.configuration_store_id, 'data'),
@@ -50,6 +52,8 @@ class HomePageCallbackPlugin:
                     'case_selection_dropdown_kwargs': 
                         self._build_case_selection_dropdown_kwargs(),
                     'open_invalid_configuration_file_error_modal': False,
+                    'disable_indexing_progress_interval':
+                        not self._dataset.is_indexing,
                 }
             except:
                 return {
@@ -59,8 +63,44 @@ class HomePageCallbackPlugin:
                         'value': dash.no_update,
                     },
                     'open_invalid_configuration_file_error_modal': configuration is not None,
+                    'disable_indexing_progress_interval': True,
                 }
 
+        @dash.callback(
+            {
+                'indexing_progress_label_children':
+                    dash.Output(id.indexing_progress_label_id, 'children'),
+                'case_selection_dropdown_option': dash.Output(
+                    id.case_selection_dropdown_id, 'options', allow_duplicate=True),
+                'disable_indexing_progress_interval': dash.Output(
+                    id.indexing_progress_interval_id, 'disabled', allow_duplicate=True),
+                'open_invalid_configuration_file_error_modal': dash.Output(
+                    id.invalid_configuration_file_error_modal_id, 'is_open', allow_duplicate=True),
+            },
+            dash.Input(id.indexing_progress_interval_id, 'n_intervals'),
+            prevent_initial_call = True,
+        )
+        def update_indexing_progress(_) -> dict:
+            # Cases indexed after start-up are appended to the dropdown, and
+            # polling stops once indexing finishes. Cases failing to index are
+            # reported as invalid configurations, as they were before indexing
+            # moved to the background
+            is_indexing = self._dataset.is_indexing
+            progress = self._dataset.indexing_progress
+            return {
+                'indexing_progress_label_children':
+                    self._build_indexing_progress_children(progress)
+                    if is_indexing or progress['failure_message'] is not None
+                    else '',
+                'case_selection_dropdown_option':
+                    self._dataset.case_id_sequence
+                    if self._dataset.case_id_sequence is not None
+                    else dash.no_update,
+                'disable_indexing_progress_interval': not is_indexing,
+                'open_invalid_configuration_file_error_modal':
+                    progress['failure_message'] is not None and not is_indexing,
+            }
+
         @dash.callback(
             {
                 'configuration': dash.Output(id.configuration_store_id, 'data'),
@@ -68,6 +108,8 @@ class HomePageCallbackPlugin:
                     dash.Output(id.invalid_configuration_file_error_modal_id, 'is_open', allow_duplicate=True),
                 'configuration_file_upload_data':
                     dash.Output(id.configuration_file_upload_id, 'contents'),
+                'disable_indexing_progress_interval': dash.Output(
+                    id.indexing_progress_interval_id, 'disabled', allow_duplicate=True),
             },
             dash.Input(id.configuration_file_upload_id, 'contents'),
             prevent_initial_call = True,
@@ -80,12 +122,14 @@ class HomePageCallbackPlugin:
                     'open_invalid_configuration_file_error_modal': False,
                     'configuration_file_upload_data':
                         None,  # Reset this so files can be uploaded repeatedly
+                    'disable_indexing_progress_interval': False,
                 }
             except:
                 return {
                     'configuration': dash.no_update,
                     'open_invalid_configuration_file_error_modal': True,
                     'configuration_file_upload_data': None,
+                    'disable_indexing_progress_interval': dash.no_update,
                 }
 
         # Close Invalid Configuration File Error Modal
@@ -100,8 +144,24 @@ class HomePageCallbackPlugin:
         )
         
     def _start_up(self, configuration: record.Configuration) -> None:
+        self._io_processing_unit.set_up(
+            configuration['organ_resampled_compression_level'])
         self._dataset.start_up(configuration)
 
+    def _build_indexing_progress_children(
+        self, progress: record.ProgressStatistics) -> str:
+        if progress['failure_message'] is not None:
+            return (
+                f'Indexing stopped at case '
+                f'{progress["completed_number"]}/{progress["total_number"]}: '
+                f'{progress["failure_message"]}'
+            )
+        else:
+            return (
+                f'Indexing cases: '
+                f'{progress["completed_number"]}/{progress["total_number"]}'
+            )
+
     def _build_case_selection_dropdown_kwargs(self) -> dict:
         return {
             'option': self._dataset.case_id_sequence,
@@ -128,4 +188,9 @@ class HomePageCallbackPlugin:
             file_name = configuration['file_name'],
             pattern = configuration['pattern'],
             tag = configuration['tag'],
+            cache_directory_path = configuration.get('cache_directory_path'),
+            transformation_store_file_path = configuration.get(
+                'transformation_store_file_path'),
+        organ_resampled_compression_level = configuration.get(
+            'organ_resampled_compression_level'),
         )  # Soft-check whether the decoded object contains all required fields
\ No newline at end of file
@@ -16,6 +16,7 @@ import numpy as np
 from application import id
 from application import keyboard_event
 from object import record
+from persistence_layer import data_accessor
 from presentation_layer.app_factory_plugin.layout import menu
 from utils import format_utils
 from utils import image_processing_utils
@@ -328,6 +329,8 @@ class CaseSectionCallbackPlugin:
                 },
                 'keyboard_event':
                     dash.Output(id.keyboard_id, 'event'),
+                'open_save_case_failure_error_modal': dash.Output(
+                    id.save_case_failure_error_modal_id, 'is_open', allow_duplicate=True),
             },
             dash.Input(id.case_selection_dropdown_id, 'value'),
             prevent_initial_call = True,
@@ -370,6 +373,8 @@ class CaseSectionCallbackPlugin:
                         self._build_slice_selection_dropdown_kwargs(),
                     'keyboard_event':
                         keyboard_event.update_backend_keyboard_event,
+                    'open_save_case_failure_error_modal':
+                        self._build_open_save_case_failure_error_modal(),
                 }
 
         @dash.callback(
@@ -384,16 +389,21 @@ class CaseSectionCallbackPlugin:
         )
         def save_case(_: int) -> tuple[bool, bool]:
             try:
-                self._save_case()
-                return {
-                    'open_save_case_success_information_modal': True,
-                    'open_save_case_failure_error_modal': False,
-                }
+                file_path_sequence = self._save_case()
             except:
+                self._data_accessor.set_dirty_flag()  # Everything is saved again
                 return {
                     'open_save_case_success_information_modal': False,
                     'open_save_case_failure_error_modal': True,
                 }
+            # Users are told once the case is written, without waiting for
+            # writes of other cases. Failed writes mark their content dirty
+            self._io_processing_unit.wait(file_path_sequence)
+            is_failed = len(self._io_processing_unit.collect_failure()) != 0
+            return {
+                'open_save_case_success_information_modal': not is_failed,
+                'open_save_case_failure_error_modal': is_failed,
+            }
 
         # Close Save Case Success Information Modal
         dash.clientside_callback(
@@ -429,29 +439,115 @@ class CaseSectionCallbackPlugin:
         except Exception as exception:
             raise exception
 
-    def _save_case(self) -> None:
+    def _save_case(self) -> tuple[str, ...]:
+        """Queues writes of the case and returns the files written."""
+        self._finish_preview()  # Previews are never saved
+        # Flags are cleared before writes are queued, so that writes failing
+        # later mark their content dirty again
+        write_transformation_spreadsheet_kwargs = self._data_accessor.get_write_transformation_spreadsheet_kwargs()
+        write_organ_resampled_map_kwargs = self._data_accessor.get_write_organ_resampled_map_kwargs()
+        organ_resampled_data_type = self._resampling_processing_unit.organ_resampled_data_type
+        self._data_accessor.clear_dirty_flag()
         self._io_processing_unit.write_transformation_spreadsheet(
-            **self._data_accessor.get_write_transformation_spreadsheet_kwargs(),
-        )
+            **write_transformation_spreadsheet_kwargs)
         self._io_processing_unit.write_organ_resampled_map(
-            **self._data_accessor.get_write_organ_resampled_map_kwargs(),
+            **write_organ_resampled_map_kwargs,
+            data_type = organ_resampled_data_type,
+        )
+        return (
+            write_transformation_spreadsheet_kwargs['file_path'],
+            *write_organ_resampled_map_kwargs['file_path_map'].values(),
         )
 
+    def _finish_preview(self) -> None:
+        # Transformations are already updated while previewing, so only the
+        # slices previewed are resampled again at the full resolution
+        if self._is_previewing:
+            self._is_previewing = False
+            match self._preview_update_backend_kwargs['mode']:
+                case id.macro_mode_id:
+                    slice_id_sequence = self._preview_update_backend_kwargs['slice_id_sequence']
+                case _:
+                    slice_id_sequence = (self._preview_update_backend_kwargs['slice_id'],)
+            resampled_sequence = self._resampling_processing_unit.resample_batch(
+                **self._data_accessor.get_resample_batch_kwargs(
+                    slice_id_sequence,
+                    self._resampling_processing_unit.is_roi_resampling,
+                ),
+            )
+            for slice_id, (body_resampled, organ_resampled) in zip(
+                slice_id_sequence, resampled_sequence):
+                self._data_accessor.update_body_resampled(
+                    slice_id, image_processing_utils.discretise(body_resampled))
+                self._data_accessor.update_organ_resampled(
+                    slice_id, organ_resampled)
+
+    def _build_open_save_case_failure_error_modal(self) -> bool:
+        # Saves are written behind, so failures of earlier saves are reported
+        # on later callbacks
+        if len(self._io_processing_unit.collect_failure()) != 0:
+            return True
+        else:
+            return dash.no_update
+
     def _shift_case(self, case_id: str) -> None:
         self._dataset.shift_case(case_id)
 
     def _set_up(self) -> None:
-        self._data_accessor.set_up(
-            self._dataset.build_data_accessor_initialiser())
+        self._is_previewing = False  # Previews left belong to the case before
+        case = self._dataset.load_case()
+        self._data_accessor = case['data_accessor']
+        self._resampling_processing_unit.set_up(
+            self._build_resampling_processing_unit_initialiser(
+                case['resampling_state']),
+            case['resampling_state'],
+        )
+        case['resampling_state'] = self._resampling_processing_unit.state
         self._transformation_processing_unit.set_up(
             self._data_accessor.build_transformation_processing_unit_initialiser())
         self._visualisation_processing_unit.set_up(
             self._data_accessor.build_visualisation_processing_unit_initialiser())
-        self._resampling_processing_unit.set_up(
-            self._data_accessor.build_resampling_processing_unit_initialiser())
         self._evaluation_processing_unit.set_up(
             self._data_accessor.build_evaluation_processing_unit_initialiser())
 
+    def _build_resampling_processing_unit_initialiser(
+        self, resampling_state: record.ResamplingState | None,
+    ) -> record.ResamplingProcessingUnitInitialiser | None:
+        # Building the initialiser copies whole volumes, which cached cases
+        # only need to publish them to the process pool
+        if (
+            resampling_state is not None
+            and not self._resampling_processing_unit.is_initialiser_required
+        ):
+            return None
+        else:
+            return self._data_accessor.build_resampling_processing_unit_initialiser()
+
+    def _load_case(
+        self, initialiser: record.DataAccessorInitialiser) -> record.Case:
+        # Cases may be loaded on the background worker of Dataset, so a new
+        # Data Accessor is set up for each of them, sharing the I/O thread pool.
+        # Saves of the case still queued are waited for before reading it back
+        self._io_processing_unit.wait((
+            initialiser['transformation_spreadsheet_file_path'],
+            *initialiser['organ_resampled_file_path_map'].values(),
+        ))
+        case_data_accessor = data_accessor.DataAccessor(self._io_thread_pool)
+        case_data_accessor.set_up(initialiser)
+        return record.Case(
+            data_accessor = case_data_accessor, resampling_state = None)
+
+    def _close_case(self, case: record.Case) -> None:
+        case['data_accessor'].close()
+
+    def _measure_case(self, case: record.Case) -> int:
+        nbyte = case['data_accessor'].nbyte
+        if case['resampling_state'] is not None:
+            nbyte += case['resampling_state']['body_resampler'].nbyte
+            nbyte += case['resampling_state']['organ_resampler'].nbyte
+            nbyte += case['resampling_state']['cache'].statistics['resident_byte']
+        return nbyte
+
     def _build_body_resampled_window_level_slider_kwargs(self) -> dict[str, int]:
         body_resampled_property = self._visualisation_processing_unit.body_resampled_property
         return {
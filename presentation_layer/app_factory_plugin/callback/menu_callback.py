@@ -61,7 +61,40 @@ class TransformationMenuCallbackPlugin:
                 translation_step_size,
                 rotation_step_size,
             )
-            self._update_backend(slice_id, slice_id_sequence, mode)
+            # Events repeated while a key is held are only previewed, and the
+            # full resolution is restored once the key is released
+            self._is_previewing = keyboard_kwargs['event']['repeat']
+            self._preview_update_backend_kwargs = {
+                'slice_id': slice_id,
+                'slice_id_sequence': slice_id_sequence,
+                'mode': mode,
+            }
+            self._update_backend(
+                slice_id, slice_id_sequence, mode, self._is_previewing)
+            return slice_id
+
+        @dash.callback(
+            dash.Output(id.slice_selection_dropdown_id, 'value', allow_duplicate=True),
+            {
+                'n_events': dash.Input(id.keyboard_release_id, 'n_events'),
+                'slice_id':
+                    dash.State(id.slice_selection_dropdown_id, 'value'),
+                'slice_id_sequence':
+                    dash.State(id.slice_selection_dropdown_id, 'options'),
+                'mode':
+                    dash.State(id.mode_selection_inline_radio_items_id, 'value'),
+            },
+            prevent_initial_call = True,
+        )
+        def refresh_preview(
+            n_events: int,
+            slice_id: str,
+            slice_id_sequence: tuple[str, ...],
+            mode: str,
+        ) -> str:
+            if not self._is_previewing:
+                raise exceptions.PreventUpdate
+            self._finish_preview()
             return slice_id
 
         @dash.callback(
@@ -164,7 +197,7 @@ class TransformationMenuCallbackPlugin:
         translation_step_size: float,
         rotation_step_size: float,
     ) -> None:
-        match event:
+        match {**event, 'repeat': False}:
             # ----- Scanner Coordinate Translation -----
             case keyboard_event.scanner_coordinate_translate_positive_x_keyboard_event:
                 self._scanner_coordinate_translate(slice_id, slice_id_sequence, mode, -1.0*translation_step_size, 'x')
@@ -368,27 +401,39 @@ class TransformationMenuCallbackPlugin:
         slice_coordinate_rotate_micro_kwargs['step_size'] = step_size
         return slice_coordinate_rotate_micro_kwargs
 
+    def _finish_preview(self) -> None:
+        # Releases may never arrive (e.g. focus leaving the window while a key
+        # is held), so previews are also finished before saving
+        if self._is_previewing:
+            self._is_previewing = False
+            self._update_backend(**self._preview_update_backend_kwargs)
+
     def _update_backend(
         self,
         slice_id: str,
         slice_id_sequence: tuple[str, ...],
         mode: str,
+        is_preview: bool = False,
     ) -> None:
         match mode:
             case id.macro_mode_id:
-                self._update_backend_macro(slice_id_sequence)
+                self._update_backend_macro(slice_id_sequence, is_preview)
             case id.micro_mode_id:
-                self._update_backend_micro(slice_id)
+                self._update_backend_micro(slice_id, is_preview)
             case _:
                 raise exceptions.PreventUpdate
     
-    def _update_backend_macro(self, slice_id_sequence: tuple[str, ...]) -> None:
+    def _update_backend_macro(
+        self, slice_id_sequence: tuple[str, ...], is_preview: bool = False,
+    ) -> None:
         for slice_id in slice_id_sequence:
-            self._update_backend_micro(slice_id)
+            self._update_transformation(slice_id)
+        self._resample_batch(slice_id_sequence, is_preview)
     
-    def _update_backend_micro(self, slice_id: str) -> None:
+    def _update_backend_micro(
+        self, slice_id: str, is_preview: bool = False) -> None:
         self._update_transformation(slice_id)
-        self._resample(slice_id)
+        self._resample(slice_id, is_preview)
     
     def _update_transformation(self, slice_id: str) -> None:
         self._data_accessor.update_transformation(
@@ -397,23 +442,35 @@ class TransformationMenuCallbackPlugin:
         )
         self._data_accessor.transform_slice(slice_id)
     
-    def _resample(self, slice_id: str) -> None:
-        self._update_body_resampled(slice_id, self._resample_body(slice_id))
-        self._update_organ_resampled(slice_id, self._resample_organ(slice_id))
+    def _resample(self, slice_id: str, is_preview: bool = False) -> None:
+        body_resampled, organ_resampled = self._resampling_processing_unit.resample(
+            **self._data_accessor.get_resample_kwargs(
+                slice_id, self._resampling_processing_unit.is_roi_resampling),
+            is_preview = is_preview,
+        )
+        self._update_body_resampled(slice_id, body_resampled)
+        self._update_organ_resampled(slice_id, organ_resampled)
     
-    def _resample_body(self, slice_id: str) -> np.ndarray:
-        return self._resampling_processing_unit.resample_body(
-            **self._data_accessor.get_resample_body_kwargs(slice_id))
+    def _resample_batch(
+        self, slice_id_sequence: tuple[str, ...], is_preview: bool = False,
+    ) -> None:
+        resampled_sequence = self._resampling_processing_unit.resample_batch(
+            **self._data_accessor.get_resample_batch_kwargs(
+                slice_id_sequence,
+                self._resampling_processing_unit.is_roi_resampling,
+            ),
+            is_preview = is_preview,
+        )
+        for slice_id, (body_resampled, organ_resampled) in zip(
+            slice_id_sequence, resampled_sequence):
+            self._update_body_resampled(slice_id, body_resampled)
+            self._update_organ_resampled(slice_id, organ_resampled)
     
     def _update_body_resampled(
         self, slice_id: str, pixel_data: np.ndarray) -> None:
         pixel_data = image_processing_utils.discretise(pixel_data)
         self._data_accessor.update_body_resampled(slice_id, pixel_data)
     
-    def _resample_organ(self, slice_id: str) -> np.ndarray:
-        return self._resampling_processing_unit.resample_organ(
-            **self._data_accessor.get_resample_organ_kwargs(slice_id))
-    
     def _update_organ_resampled(
         self, slice_id: str, pixel_data: np.ndarray) -> None:
         self._data_accessor.update_organ_resampled(slice_id, pixel_data)
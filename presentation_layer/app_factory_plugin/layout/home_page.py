@@ -19,6 +19,7 @@ from utils import widget_utils
 
 TITLE_CHILDREN = 'SVRDA: Dataset Annotation Tool for SVR'
 CONFIGURATION_FILE_UPLOAD_CHILDREN = 'Please drag and drop your configuration file, or click here to select files.'
+INDEXING_PROGRESS_INTERVAL = 500  # In milliseconds
 INVALID_CONFIGURATION_FILE_ERROR_MODAL_CHILDREN = (
     f'Invalid configuration file. '
     f'Please check the example in the documentation and try again.'
@@ -46,8 +47,13 @@ class HomePagePlugin:
                                 style = {'height':'20%'},
                                 align = 'center',
                             ),
-                            dbc.Row(style={'height':'10%'}),
+                            dbc.Row(
+                                children = self._build_indexing_progress_label(),
+                                style = {'height':'10%'},
+                                align = 'center',
+                            ),
                             dbc.Row(self._build_configuration_store(configuration_file_path)),
+                            dbc.Row(self._build_indexing_progress_interval()),
                             dbc.Row(self._build_invalid_configuration_file_error_modal()),
                         ),
                         width = {'size':8, 'offset':2},
@@ -72,6 +78,19 @@ class HomePagePlugin:
             children = CONFIGURATION_FILE_UPLOAD_CHILDREN,
         )
     
+    def _build_indexing_progress_label(self) -> dbc.Label:
+        return widget_utils.build_label(
+            id = id.indexing_progress_label_id,
+            class_name = 'text_centred_label',
+        )
+    
+    def _build_indexing_progress_interval(self) -> dcc.Interval:
+        # Polling is enabled only while the dataset is being indexed
+        return widget_utils.build_interval(
+            id = id.indexing_progress_interval_id,
+            interval = INDEXING_PROGRESS_INTERVAL,
+        )
+    
     def _build_configuration_store(
         self, configuration_file_path: str | None) -> dcc.Store:
         try:
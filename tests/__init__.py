@@ -0,0 +1,5 @@
+"""Tests of the application.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
@@ -0,0 +1,94 @@
+"""Tests of caches.
+
+This module checks that LRU caches evict the least recently
+used values once their byte budget is exceeded, and release
+every value they drop through the eviction callback.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+
+from object import cache
+
+
+BYTE_BUDGET = 10
+
+
+def _construct_cache() -> tuple[cache.LRUCache, list]:
+    released_list = []
+    return cache.LRUCache(BYTE_BUDGET, released_list.append), released_list
+
+
+def test_put_evicts_least_recently_used_beyond_byte_budget() -> None:
+    lru_cache, released_list = _construct_cache()
+    lru_cache.put('a', 'value-a', 4)
+    lru_cache.put('b', 'value-b', 4)
+    assert lru_cache.get('a') == 'value-a'  # b is now least recently used
+    lru_cache.put('c', 'value-c', 4)
+    assert 'b' not in lru_cache
+    assert 'a' in lru_cache and 'c' in lru_cache
+    assert released_list == ['value-b']
+    assert lru_cache.statistics['resident_byte'] == 8
+    assert lru_cache.statistics['eviction_count'] == 1
+
+def test_put_evicts_until_within_byte_budget() -> None:
+    lru_cache, released_list = _construct_cache()
+    for key in 'abcde':
+        lru_cache.put(key, f'value-{key}', 2)
+    lru_cache.put('f', 'value-f', 7)
+    assert released_list == ['value-a', 'value-b', 'value-c', 'value-d']
+    assert len(lru_cache) == 2
+    assert lru_cache.statistics['resident_byte'] == 9
+
+def test_put_releases_oversized_value_without_caching() -> None:
+    lru_cache, released_list = _construct_cache()
+    lru_cache.put('a', 'value-a', 4)
+    lru_cache.put('b', 'value-b', BYTE_BUDGET + 1)
+    assert 'b' not in lru_cache
+    assert 'a' in lru_cache
+    assert released_list == ['value-b']
+
+def test_put_releases_replaced_value() -> None:
+    lru_cache, released_list = _construct_cache()
+    lru_cache.put('a', 'value-a', 4)
+    lru_cache.put('a', 'value-a-new', 6)
+    assert lru_cache.get('a') == 'value-a-new'
+    assert released_list == ['value-a']
+    assert lru_cache.statistics['resident_byte'] == 6
+
+def test_put_keeps_value_put_again() -> None:
+    lru_cache, released_list = _construct_cache()
+    value = ['still', 'in', 'use']
+    lru_cache.put('a', value, 4)
+    lru_cache.put('a', value, 5)
+    assert released_list == []
+    assert lru_cache.statistics['resident_byte'] == 5
+
+def test_pop_returns_value_without_releasing() -> None:
+    lru_cache, released_list = _construct_cache()
+    lru_cache.put('a', 'value-a', 4)
+    assert lru_cache.pop('a') == 'value-a'
+    assert lru_cache.pop('a', 'default') == 'default'
+    assert released_list == []
+    assert lru_cache.statistics['resident_byte'] == 0
+
+def test_clear_releases_every_value() -> None:
+    lru_cache, released_list = _construct_cache()
+    lru_cache.put('a', 'value-a', 4)
+    lru_cache.put('b', 'value-b', 4)
+    lru_cache.clear()
+    assert len(lru_cache) == 0
+    assert sorted(released_list) == ['value-a', 'value-b']
+
+def test_statistics_count_hits_and_misses() -> None:
+    lru_cache, _ = _construct_cache()
+    lru_cache.put('a', 'value-a', 4)
+    lru_cache.get('a')
+    lru_cache.get('b')
+    lru_cache.get('b')
+    statistics = lru_cache.statistics
+    assert statistics['hit_count'] == 1
+    assert statistics['miss_count'] == 2
+    assert statistics['entry_count'] == 1
+    assert statistics['byte_budget'] == BYTE_BUDGET
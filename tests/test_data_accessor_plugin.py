@@ -0,0 +1,120 @@
+"""Tests of data accessor plugins.
+
+This module checks that only resampled organs of slices
+changed since the last save are selected for writing, and
+that failed writes select them again.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from object import journal
+from object import transformation
+from persistence_layer import data_accessor_plugin
+
+
+SLICE_ID_SEQUENCE = ('slice-a', 'slice-b', 'slice-c')
+
+
+class _Image:
+    """Image returning copies of its content like images do."""
+
+    def __init__(self, pixel_data: np.ndarray) -> None:
+        self._pixel_data = pixel_data
+
+    @property
+    def pixel_data(self) -> np.ndarray:
+        return np.array(self._pixel_data)
+
+    @property
+    def affine_current(self) -> np.ndarray:
+        return np.array(self._pixel_data)
+
+class _DataAccessor(
+    data_accessor_plugin.TransformationProcessingUnitPlugin,
+    data_accessor_plugin.IOProcessingUnitPlugin,
+):
+    """Data accessor holding only what saving needs."""
+
+    def __init__(self, journal_file_path: str) -> None:
+        self._case_id = 'case'
+        self._transformation_map = {
+            slice_id: transformation.RigidTransformation((0.0,) * 6)
+            for slice_id in SLICE_ID_SEQUENCE
+        }
+        self._transformation_journal = journal.TransformationJournal(
+            journal_file_path, SLICE_ID_SEQUENCE)
+        self._transformation_store = None
+        self._transformation_spreadsheet_file_path = 'transformation.csv'
+        self._is_transformation_spreadsheet_dirty = False
+        self._slice_map = {
+            slice_id: _Image(np.eye(4)) for slice_id in SLICE_ID_SEQUENCE}
+        self._organ_resampled_map = {
+            slice_id: _Image(np.full((2, 2), i))
+            for i, slice_id in enumerate(SLICE_ID_SEQUENCE)
+        }
+        self._organ_resampled_file_path_map = {
+            slice_id: f'{slice_id}-resampled.nii.gz'
+            for slice_id in SLICE_ID_SEQUENCE
+        }
+        self._organ_resampled_dirty_slice_id_set = set()
+
+
+@pytest.fixture
+def accessor(tmp_path) -> _DataAccessor:
+    accessor = _DataAccessor(str(tmp_path / 'transformation.csv.journal'))
+    yield accessor
+    accessor._transformation_journal.close()
+
+
+def test_only_changed_slices_are_selected(accessor: _DataAccessor) -> None:
+    accessor.update_transformation(
+        'slice-b', transformation.RigidTransformation((1.0,) + (0.0,) * 5))
+    accessor.update_transformation(
+        'slice-c', transformation.RigidTransformation((0.0,) * 6))
+    kwargs = accessor.get_write_organ_resampled_map_kwargs()
+    assert tuple(kwargs['file_path_map']) == ('slice-b',)
+    assert tuple(kwargs['pixel_data_map']) == ('slice-b',)
+    assert tuple(kwargs['affine_map']) == ('slice-b',)
+    np.testing.assert_array_equal(kwargs['pixel_data_map']['slice-b'], 1)
+    assert accessor.get_write_transformation_spreadsheet_kwargs()['is_dirty']
+
+def test_nothing_is_selected_once_saved(accessor: _DataAccessor) -> None:
+    accessor.update_transformation(
+        'slice-a', transformation.RigidTransformation((1.0,) + (0.0,) * 5))
+    accessor.get_write_organ_resampled_map_kwargs()
+    accessor.clear_dirty_flag()
+    assert accessor.get_write_organ_resampled_map_kwargs()['file_path_map'] == {}
+    assert not accessor.get_write_transformation_spreadsheet_kwargs()['is_dirty']
+
+def test_failed_writes_are_selected_again(accessor: _DataAccessor) -> None:
+    accessor.update_transformation(
+        'slice-a', transformation.RigidTransformation((1.0,) + (0.0,) * 5))
+    kwargs = accessor.get_write_organ_resampled_map_kwargs()
+    spreadsheet_kwargs = accessor.get_write_transformation_spreadsheet_kwargs()
+    accessor.clear_dirty_flag()
+    kwargs['on_failed']('slice-a')
+    spreadsheet_kwargs['on_failed']()
+    assert tuple(
+        accessor.get_write_organ_resampled_map_kwargs()['file_path_map']
+    ) == ('slice-a',)
+    assert accessor.get_write_transformation_spreadsheet_kwargs()['is_dirty']
+
+def test_set_dirty_flag_selects_every_slice(accessor: _DataAccessor) -> None:
+    accessor.set_dirty_flag()
+    assert set(
+        accessor.get_write_organ_resampled_map_kwargs()['file_path_map']
+    ) == set(SLICE_ID_SEQUENCE)
+
+def test_selected_content_is_read_only_copy(accessor: _DataAccessor) -> None:
+    accessor.set_dirty_flag()
+    kwargs = accessor.get_write_organ_resampled_map_kwargs()
+    for slice_id in SLICE_ID_SEQUENCE:
+        assert not kwargs['pixel_data_map'][slice_id].flags.writeable
+        assert not kwargs['affine_map'][slice_id].flags.writeable
+    # Content held by the accessor is still writable
+    assert accessor._organ_resampled_map['slice-a']._pixel_data.flags.writeable
@@ -0,0 +1,118 @@
+"""Tests of interpolators.
+
+This module checks that the native interpolators give the
+same values as scipy.interpolate.RegularGridInterpolator,
+which they replace in resamplers.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from scipy import interpolate
+
+from object import interpolator
+
+
+GRID_SIZE = (7, 5, 6)
+SAMPLE_NUMBER = 2000
+DATA_TYPE_SEQUENCE = (np.uint8, np.uint16, np.int16, np.float32)
+INTERPOLATOR_MAP = {
+    'linear': interpolator.LinearInterpolator,
+    'nearest': interpolator.NearestInterpolator,
+}
+
+
+def _build_grid_pixel_data(data_type: type) -> np.ndarray:
+    generator = np.random.default_rng(0)
+    if np.issubdtype(data_type, np.integer):
+        information = np.iinfo(data_type)
+        return generator.integers(
+            information.min, information.max, GRID_SIZE, endpoint=True,
+        ).astype(data_type)
+    else:
+        return generator.normal(0, 100, GRID_SIZE).astype(data_type)
+
+def _interpolate_by_scipy(
+    grid_pixel_data: np.ndarray, method: str, grid_index: np.ndarray,
+) -> np.ndarray:
+    return interpolate.RegularGridInterpolator(
+        points = tuple(np.arange(size) for size in grid_pixel_data.shape),
+        values = grid_pixel_data,
+        method = method,
+        bounds_error = False,
+        fill_value = interpolator.FILL_VALUE,
+    )(grid_index.astype(np.float64))
+
+def _assert_equivalent(
+    grid_pixel_data: np.ndarray, method: str, grid_index: np.ndarray,
+) -> None:
+    # Indices are sampled as float32, which both paths are given as is
+    grid_index = grid_index.astype(np.float32)
+    pixel_data = INTERPOLATOR_MAP[method](grid_pixel_data)(grid_index)
+    pixel_data_expected = _interpolate_by_scipy(
+        grid_pixel_data, method, grid_index)
+    assert pixel_data.dtype == np.float32
+    assert pixel_data.shape == grid_index.shape[:-1]
+    np.testing.assert_allclose(
+        pixel_data,
+        pixel_data_expected,
+        rtol = 1e-5,
+        atol = 1e-5 * np.abs(grid_pixel_data).max(),
+    )
+
+
+@pytest.mark.parametrize('data_type', DATA_TYPE_SEQUENCE)
+@pytest.mark.parametrize('method', INTERPOLATOR_MAP)
+def test_interpolate_inside(data_type: type, method: str) -> None:
+    generator = np.random.default_rng(1)
+    grid_index = generator.uniform(
+        0, np.subtract(GRID_SIZE, 1), (SAMPLE_NUMBER, 3))
+    _assert_equivalent(_build_grid_pixel_data(data_type), method, grid_index)
+
+@pytest.mark.parametrize('data_type', DATA_TYPE_SEQUENCE)
+@pytest.mark.parametrize('method', INTERPOLATOR_MAP)
+def test_interpolate_outside(data_type: type, method: str) -> None:
+    generator = np.random.default_rng(2)
+    grid_index = generator.uniform(
+        -3, np.add(GRID_SIZE, 2), (SAMPLE_NUMBER, 3))
+    _assert_equivalent(_build_grid_pixel_data(data_type), method, grid_index)
+
+@pytest.mark.parametrize('data_type', DATA_TYPE_SEQUENCE)
+@pytest.mark.parametrize('method', INTERPOLATOR_MAP)
+def test_interpolate_boundary(data_type: type, method: str) -> None:
+    # Grid points themselves, the last ones in particular, and points just
+    # beyond the first and last ones
+    axis_index_sequence = tuple(
+        np.array((-1e-3, 0, 0.25, size-1.25, size-1, size-1+1e-3))
+        for size in GRID_SIZE
+    )
+    grid_index = np.stack(
+        np.meshgrid(*axis_index_sequence, indexing='ij'), axis=-1)
+    _assert_equivalent(_build_grid_pixel_data(data_type), method, grid_index)
+
+@pytest.mark.parametrize('data_type', DATA_TYPE_SEQUENCE)
+def test_interpolate_nearest_tie(data_type: type) -> None:
+    axis_index_sequence = tuple(
+        np.arange(size-1) + 0.5 for size in GRID_SIZE)
+    grid_index = np.stack(
+        np.meshgrid(*axis_index_sequence, indexing='ij'), axis=-1)
+    _assert_equivalent(_build_grid_pixel_data(data_type), 'nearest', grid_index)
+
+@pytest.mark.parametrize('method', INTERPOLATOR_MAP)
+def test_interpolate_shared_weight(method: str) -> None:
+    # Weights built for one volume apply to any volume on the same grid
+    grid_index = np.random.default_rng(3).uniform(
+        -1, GRID_SIZE, (SAMPLE_NUMBER, 3)).astype(np.float32)
+    interpolator_body = INTERPOLATOR_MAP[method](
+        _build_grid_pixel_data(np.int16))
+    grid_pixel_data_organ = _build_grid_pixel_data(np.uint8)
+    interpolator_organ = INTERPOLATOR_MAP[method](grid_pixel_data_organ)
+    weight = interpolator_body.build_weight(grid_index)
+    assert interpolator_organ.can_interpolate(weight)
+    np.testing.assert_array_equal(
+        interpolator_organ.interpolate(weight),
+        interpolator_organ(grid_index),
+    )
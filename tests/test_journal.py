@@ -0,0 +1,123 @@
+"""Tests of journals.
+
+This module checks that transformation journals replay the
+latest parameter of each slice after partial records left by
+crashes are truncated and after records are compacted away.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+
+import pytest
+
+from object import journal
+
+
+SLICE_ID_SEQUENCE = ('slice-a', 'slice-b', 'slice-c')
+
+
+def _build_parameter(value: float) -> tuple[float, ...]:
+    return (value,) * journal.PARAMETER_LENGTH
+
+@pytest.fixture
+def file_path(tmp_path) -> str:
+    return str(tmp_path / 'transformation.journal')
+
+
+def test_replay_returns_latest_parameter_of_each_slice(file_path: str) -> None:
+    transformation_journal = journal.TransformationJournal(
+        file_path, SLICE_ID_SEQUENCE)
+    transformation_journal.append('slice-a', _build_parameter(1.0))
+    transformation_journal.append('slice-b', _build_parameter(2.0))
+    transformation_journal.append('slice-a', _build_parameter(3.0))
+    assert transformation_journal.replay() == {
+        'slice-a': _build_parameter(3.0),
+        'slice-b': _build_parameter(2.0),
+    }
+    assert transformation_journal.record_number == 3
+    transformation_journal.close()
+
+def test_replay_ignores_partial_record_left_by_crash(file_path: str) -> None:
+    transformation_journal = journal.TransformationJournal(
+        file_path, SLICE_ID_SEQUENCE)
+    transformation_journal.append('slice-a', _build_parameter(1.0))
+    transformation_journal.append('slice-b', _build_parameter(2.0))
+    transformation_journal.close()
+    with open(file_path, 'ab') as file:
+        file.write(b'\xff' * (journal.RECORD_DATA_TYPE.itemsize // 2))
+
+    transformation_journal = journal.TransformationJournal(
+        file_path, SLICE_ID_SEQUENCE)
+    assert transformation_journal.record_number == 2
+    assert transformation_journal.replay() == {
+        'slice-a': _build_parameter(1.0),
+        'slice-b': _build_parameter(2.0),
+    }
+    # The partial record is overwritten by the next append
+    transformation_journal.append('slice-c', _build_parameter(3.0))
+    transformation_journal.close()
+    transformation_journal = journal.TransformationJournal(
+        file_path, SLICE_ID_SEQUENCE)
+    assert transformation_journal.replay() == {
+        'slice-a': _build_parameter(1.0),
+        'slice-b': _build_parameter(2.0),
+        'slice-c': _build_parameter(3.0),
+    }
+    transformation_journal.close()
+
+def test_replay_ignores_records_of_slices_no_longer_in_case(
+    file_path: str) -> None:
+    transformation_journal = journal.TransformationJournal(
+        file_path, SLICE_ID_SEQUENCE)
+    transformation_journal.append('slice-b', _build_parameter(2.0))
+    transformation_journal.close()
+
+    transformation_journal = journal.TransformationJournal(
+        file_path, ('slice-a', 'slice-x'))
+    assert transformation_journal.replay() == {}
+    transformation_journal.close()
+
+def test_compact_keeps_records_appended_after_save(file_path: str) -> None:
+    transformation_journal = journal.TransformationJournal(
+        file_path, SLICE_ID_SEQUENCE)
+    transformation_journal.append('slice-a', _build_parameter(1.0))
+    transformation_journal.append('slice-b', _build_parameter(2.0))
+    record_number_saved = transformation_journal.record_number
+    transformation_journal.append('slice-c', _build_parameter(3.0))
+    transformation_journal.compact(record_number_saved)
+    assert transformation_journal.record_number == 3
+    assert transformation_journal.replay() == {
+        'slice-c': _build_parameter(3.0)}
+    # Compacting the same records again does nothing
+    transformation_journal.compact(record_number_saved)
+    assert transformation_journal.replay() == {
+        'slice-c': _build_parameter(3.0)}
+    transformation_journal.append('slice-a', _build_parameter(4.0))
+    assert transformation_journal.replay() == {
+        'slice-a': _build_parameter(4.0),
+        'slice-c': _build_parameter(3.0),
+    }
+    transformation_journal.close()
+
+def test_compact_removes_journal_once_everything_is_saved(
+    file_path: str, tmp_path) -> None:
+    transformation_journal = journal.TransformationJournal(
+        file_path, SLICE_ID_SEQUENCE)
+    transformation_journal.append('slice-a', _build_parameter(1.0))
+    transformation_journal.compact(transformation_journal.record_number)
+    assert not (tmp_path / 'transformation.journal').exists()
+    assert transformation_journal.replay() == {}
+    transformation_journal.close()
+
+def test_open_transformation_journal_shares_journal_per_file(
+    file_path: str) -> None:
+    transformation_journal = journal.open_transformation_journal(
+        file_path, ('slice-a',))
+    transformation_journal_shared = journal.open_transformation_journal(
+        file_path, ('slice-a', 'slice-b'))
+    assert transformation_journal_shared is transformation_journal
+    transformation_journal.append('slice-b', _build_parameter(2.0))
+    assert transformation_journal.replay() == {
+        'slice-b': _build_parameter(2.0)}
+    transformation_journal.close()
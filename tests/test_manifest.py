@@ -0,0 +1,89 @@
+"""Tests of dataset manifests.
+
+This module checks that dataset manifests are written and
+read back as a whole, that missing or corrupted manifests
+are rebuilt, and that manifests of other configurations are
+never reused.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip('pandas')
+# Manifests are read and written by io_utils, which needs the image stack
+dataset = pytest.importorskip('database_layer.dataset')
+
+from object import record
+from object import spreadsheet_builder
+
+
+def _build_configuration(dataset_directory_path: str) -> record.Configuration:
+    return record.Configuration(
+        dataset_directory_path = dataset_directory_path,
+        directory_name = {
+            'body': 'body', 'organ': 'organ', 'organ_resampled': 'organ',
+            'slice': 'slice', 'slice_mask': 'slice_mask',
+        },
+        file_name = {'transformation_spreadsheet': 'transformation'},
+        pattern = {
+            'body': '*', 'organ': '*', 'slice': '*', 'slice_mask': 'null'},
+        tag = {'organ_resampled': '-resampled'},
+        cache_directory_path = None,
+        transformation_store_file_path = None,
+        organ_resampled_compression_level = None,
+    )
+
+def _build_manifest(configuration_hash: str) -> record.DatasetManifest:
+    return record.DatasetManifest(
+        configuration_hash = configuration_hash,
+        case_map = {
+            '/dataset/case-1': record.DatasetManifestCase(
+                modification_time = 123456789,
+                row_map = {'case_id': ['case-1'], 'slice_id': ['slice-a']},
+            ),
+        },
+    )
+
+
+def test_manifest_written_is_read_back(tmp_path) -> None:
+    dataset_ = dataset.Dataset()
+    configuration = _build_configuration(str(tmp_path))
+    manifest_file_path = dataset_._build_manifest_file_path(configuration)
+    manifest = _build_manifest('hash')
+    dataset_._write_manifest(manifest, manifest_file_path)
+    assert dataset_._read_manifest(manifest_file_path) == manifest
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        dataset.MANIFEST_FILE_NAME]
+
+def test_manifest_written_replaces_previous_one(tmp_path) -> None:
+    dataset_ = dataset.Dataset()
+    manifest_file_path = str(tmp_path / dataset.MANIFEST_FILE_NAME)
+    dataset_._write_manifest(_build_manifest('hash-old'), manifest_file_path)
+    dataset_._write_manifest(_build_manifest('hash-new'), manifest_file_path)
+    assert dataset_._read_manifest(manifest_file_path)['configuration_hash'] == 'hash-new'
+
+def test_missing_manifest_is_rebuilt(tmp_path) -> None:
+    assert dataset.Dataset()._read_manifest(
+        str(tmp_path / dataset.MANIFEST_FILE_NAME)) is None
+
+def test_corrupted_manifest_is_rebuilt(tmp_path) -> None:
+    manifest_file_path = tmp_path / dataset.MANIFEST_FILE_NAME
+    manifest_file_path.write_text('{"configuration_hash": ')
+    assert dataset.Dataset()._read_manifest(str(manifest_file_path)) is None
+
+def test_manifest_is_only_reused_for_same_configuration(tmp_path) -> None:
+    builder = spreadsheet_builder.DatasetSpreadsheetBuilder(
+        _build_configuration(str(tmp_path)))
+    configuration_hash = builder._build_configuration_hash()
+    builder_other = spreadsheet_builder.DatasetSpreadsheetBuilder(
+        _build_configuration(str(tmp_path / 'other')))
+    assert builder_other._build_configuration_hash() != configuration_hash
+
+    manifest = _build_manifest(configuration_hash)
+    builder.build_case_iterable(manifest)  # Sets up the manifest being built
+    assert builder._extract_case_map(manifest) == manifest['case_map']
+    assert builder._extract_case_map(_build_manifest('hash-other')) == {}
+    assert builder._extract_case_map(None) == {}
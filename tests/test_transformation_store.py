@@ -0,0 +1,92 @@
+"""Tests of transformation stores.
+
+This module checks that transformations upserted into the
+store are read back as written, and that spreadsheets
+survive a round trip through importing and exporting.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+pd = pytest.importorskip('pandas')
+# Spreadsheets are read and written by io_utils, which needs the image stack
+transformation_store = pytest.importorskip('object.transformation_store')
+
+
+PARAMETER_COLUMN_SEQUENCE = transformation_store.PARAMETER_COLUMN_SEQUENCE[:6]
+
+
+def _build_content(
+    case_id: str, slice_id_sequence: tuple[str, ...], value: float,
+) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            'case_id': (case_id,) * len(slice_id_sequence),
+            'slice_id': slice_id_sequence,
+        } | {
+            column: np.full(len(slice_id_sequence), value, np.float32)
+            for column in PARAMETER_COLUMN_SEQUENCE
+        }
+    )
+
+@pytest.fixture
+def store(tmp_path) -> transformation_store.TransformationStore:
+    return transformation_store.TransformationStore(
+        str(tmp_path / 'transformation.sqlite'))
+
+
+def test_read_returns_content_upserted(
+    store: transformation_store.TransformationStore) -> None:
+    content = _build_content('case-1', ('slice-a', 'slice-b'), 0.5)
+    store.upsert(content)
+    content_read = store.read('case-1')
+    assert tuple(content_read.columns) == (
+        'case_id', 'slice_id', *PARAMETER_COLUMN_SEQUENCE)
+    pd.testing.assert_frame_equal(
+        content_read, content, check_dtype=False)
+    assert store.contain('case-1')
+    assert not store.contain('case-2')
+
+def test_upsert_replaces_existing_rows(
+    store: transformation_store.TransformationStore) -> None:
+    store.upsert(_build_content('case-1', ('slice-a', 'slice-b'), 0.5))
+    store.upsert(_build_content('case-1', ('slice-b',), 1.5))
+    store.upsert(_build_content('case-2', ('slice-a',), 2.5))
+    content_read = store.read('case-1').set_index('slice_id')
+    assert content_read.loc['slice-a', 'translation_x'] == 0.5
+    assert content_read.loc['slice-b', 'translation_x'] == 1.5
+    assert len(store.read()) == 3
+
+def test_upsert_rejects_unsupported_column(
+    store: transformation_store.TransformationStore) -> None:
+    content = _build_content('case-1', ('slice-a',), 0.5)
+    content['unsupported'] = 0.0
+    with pytest.raises(ValueError):
+        store.upsert(content)
+
+def test_spreadsheets_survive_import_and_export(
+    store: transformation_store.TransformationStore, tmp_path) -> None:
+    content_map = {
+        'case-1': _build_content('case-1', ('slice-a', 'slice-b'), 0.5),
+        'case-2': _build_content('case-2', ('slice-a',), 1.5),
+    }
+    for case_id, content in content_map.items():
+        content.to_csv(tmp_path / f'{case_id}.csv', index=False)
+    store.import_spreadsheet((
+        *(str(tmp_path / f'{case_id}.csv') for case_id in content_map),
+        str(tmp_path / 'missing.csv'),
+    ))
+    store.export_spreadsheet({
+        case_id: str(tmp_path / f'{case_id}-exported.csv')
+        for case_id in content_map
+    })
+    for case_id, content in content_map.items():
+        pd.testing.assert_frame_equal(
+            pd.read_csv(tmp_path / f'{case_id}-exported.csv'),
+            content,
+            check_dtype = False,
+        )
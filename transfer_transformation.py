@@ -0,0 +1,82 @@
+"""Transfer Transformation.
+
+This module is used to transfer transformations between the
+transformation spreadsheets of a dataset and its
+transformation store, both found from the configuration.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+import argparse
+import sys
+
+import pandas as pd
+
+from object import record
+from object import spreadsheet_builder
+from object import transformation_store
+from utils import io_utils
+
+
+def main() -> int:
+    argument = _parse_argument()
+    configuration = _read_configuration(argument.configuration)
+    if configuration['transformation_store_file_path'] is None:
+        raise ValueError(
+            'Can not find transformation_store_file_path in the configuration')
+    store = transformation_store.TransformationStore(
+        configuration['transformation_store_file_path'])
+    dataset_spreadsheet = _build_dataset_spreadsheet(configuration)
+    match argument.direction:
+        case 'import':
+            store.import_spreadsheet(
+                dataset_spreadsheet['transformation_spreadsheet_file_path'].unique())
+        case 'export':
+            store.export_spreadsheet(
+                _build_transformation_spreadsheet_file_path_map(
+                    dataset_spreadsheet))
+        case _:
+            raise ValueError(f'Unsupported direction: {argument.direction}')
+    return 0
+
+def _parse_argument() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=globals()['__doc__'])
+    parser.add_argument(
+        'direction',
+        choices = ('import', 'export'),
+        help = 'import spreadsheets into the store, or export the store to them',
+    )
+    parser.add_argument('-c', '--configuration', type=str, required=True)
+    return parser.parse_args()
+
+def _read_configuration(configuration_file_path: str) -> record.Configuration:
+    configuration = io_utils.read_file(configuration_file_path)
+    return record.Configuration(
+        dataset_directory_path = configuration['dataset_directory_path'],
+        directory_name = configuration['directory_name'],
+        file_name = configuration['file_name'],
+        pattern = configuration['pattern'],
+        tag = configuration['tag'],
+        cache_directory_path = configuration.get('cache_directory_path'),
+        transformation_store_file_path = configuration.get(
+            'transformation_store_file_path'),
+        organ_resampled_compression_level = configuration.get(
+            'organ_resampled_compression_level'),
+    )
+
+def _build_dataset_spreadsheet(
+    configuration: record.Configuration) -> pd.DataFrame:
+    return spreadsheet_builder.DatasetSpreadsheetBuilder(
+        configuration).build_spreadsheet()
+
+def _build_transformation_spreadsheet_file_path_map(
+    dataset_spreadsheet: pd.DataFrame) -> dict[str, str]:
+    return dict(zip(
+        dataset_spreadsheet['case_id'],
+        dataset_spreadsheet['transformation_spreadsheet_file_path'],
+    ))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,15 +9,14 @@ Date: 21/03/2023
 from __future__ import annotations
 import base64
 import functools
+import gzip
 import typing
 
-import itk
 import nibabel
 import numpy as np
 import orjson
 import pandas as pd
 from plotly import graph_objects
-from vtkmodules.util import numpy_support
 
 from object import record
 from utils import image_processing_utils
@@ -32,6 +31,7 @@ JSON_DATA_TYPE_MAP = {
     np.dtype(np.uint8): 'Uint8Array',
     np.dtype(np.uint16): 'Uint16Array',
 }
+COMPRESSION_LEVEL = 1  # Same as nibabel, from 0 (stored) to 9 (smallest)
 
 ReadableContent: typing.TypeAlias = pd.DataFrame | dict | np.ndarray
 
@@ -66,56 +66,59 @@ def _read_json_file(file_path: str) -> dict:
 def _read_npy_file(file_path: str) -> np.ndarray:
     return np.load(file_path)
 
-def read_pixel_data(file_path: str) -> np.ndarray:
-    pixel_data_reader = _select_pixel_data_reader(
+def read_image(file_path: str) -> record.ImageContent:
+    image_reader = _select_image_reader(
         path_utils.extract_file_extension(file_path))
-    pixel_data = pixel_data_reader(file_path)
-    return pixel_data
-    
-def _select_pixel_data_reader(file_extension: str) -> typing.Callable:
+    image = image_reader(file_path)
+    return image
+
+def _select_image_reader(file_extension: str) -> typing.Callable:
     match file_extension:
         case '.nii' | '.nii.gz':
-            return _read_nii_pixel_data
+            return _read_nii_image
         case _:
             raise ValueError(f'Unsupported file extension: {file_extension}')
 
-def _read_nii_pixel_data(file_path: str) -> np.ndarray:
+def _read_nii_image(file_path: str) -> record.ImageContent:
+    # The file is decoded once for both its pixel data and affine
     image = nibabel.load(file_path)
-    pixel_data = np.asanyarray(image.dataobj)
-    return pixel_data
+    return record.ImageContent(
+        pixel_data = np.asanyarray(image.dataobj),
+        affine = image.affine,
+    )
 
-def read_affine(file_path: str) -> np.ndarray:
-    affine_reader = _select_affine_reader(
+def read_header(file_path: str) -> record.ImageHeader:
+    header_reader = _select_header_reader(
         path_utils.extract_file_extension(file_path))
-    affine = affine_reader(file_path)
-    return affine
-    
-def _select_affine_reader(file_extension: str) -> typing.Callable:
+    header = header_reader(file_path)
+    return header
+
+def _select_header_reader(file_extension: str) -> typing.Callable:
     match file_extension:
         case '.nii' | '.nii.gz':
-            return _read_nii_affine
+            return _read_nii_header
         case _:
             raise ValueError(f'Unsupported file extension: {file_extension}')
 
-def _read_nii_affine(file_path: str) -> np.ndarray:
+def _read_nii_header(file_path: str) -> record.ImageHeader:
+    # Only the header is read, and pixel data stays unread behind the proxy
     image = nibabel.load(file_path)
-    affine = image.affine
-    return affine
-
-def read_field(file_path: str) -> record.Field:
-    def _read_pixel_data(file_path: str) -> np.ndarray:
-        """Reads the pixel data from the given file.
-        
-        Reads and returns the pixel data from the given file
-        by using ITK and VTK. This function is referenced
-        from the dash-vtk demo and should only be used in
-        reading field.
+    return record.ImageHeader(
+        affine = image.affine,
+        shape = image.shape,
+        dtype = image.get_data_dtype(),
+    )
+
+def build_field(pixel_data: np.ndarray) -> record.Field:
+    def _flatten(pixel_data: np.ndarray) -> np.ndarray:
+        """Flattens the pixel data in the order of VTK.
+
+        Flattens and returns the pixel data with the first
+        axis varying fastest, which is how VTK stores the
+        point scalars of images. This gives the same values
+        as reading the file again through ITK and VTK.
         """
-        image_itk = itk.imread(file_path)
-        image_vtk = itk.vtk_image_from_image(image_itk)
-        pixel_data = numpy_support.vtk_to_numpy(
-            image_vtk.GetPointData().GetScalars())
-        return pixel_data
+        return np.ravel(pixel_data, order='F')
 
     def _encode(array: np.ndarray) -> dict | list:
         """Encodes the array using base64.
@@ -161,7 +164,7 @@ def read_field(file_path: str) -> record.Field:
 
         return array.tolist()
 
-    pixel_data = _read_pixel_data(file_path)
+    pixel_data = _flatten(pixel_data)
     field = record.Field(
         name = 'Scalars',
         numberOfComponents = 1,
@@ -195,18 +198,44 @@ def _(content: graph_objects.Figure, file_path: str) -> None:
     content.write_image(file_path)
 
 def write_image(
-    pixel_data: np.ndarray, affine: np.ndarray, file_path: str) -> None:
+    pixel_data: np.ndarray,
+    affine: np.ndarray,
+    file_path: str,
+    compression_level: int = COMPRESSION_LEVEL,
+) -> None:
     image_writer = _select_image_writer(
         path_utils.extract_file_extension(file_path))
-    image_writer(pixel_data, affine, file_path)
+    image_writer(pixel_data, affine, file_path, compression_level)
 
 def _select_image_writer(file_extension: str) -> typing.Callable:
     match file_extension:
-        case '.nii' | '.nii.gz':
+        case '.nii':
             return _write_nii_image
-        case '_':
+        case '.nii.gz':
+            return _write_nii_gz_image
+        case _:
             raise ValueError(f'Unsupported file extension: {file_extension}')
 
 def _write_nii_image(
-    pixel_data: np.ndarray, affine: np.ndarray, file_path: str) -> None:
-    nibabel.save(nibabel.Nifti1Image(pixel_data, affine), file_path)
\ No newline at end of file
+    pixel_data: np.ndarray,
+    affine: np.ndarray,
+    file_path: str,
+    compression_level: int,
+) -> None:
+    # Files with no compression ignore the compression level
+    with open(file_path, 'wb') as file:
+        file.write(nibabel.Nifti1Image(pixel_data, affine).to_bytes())
+
+def _write_nii_gz_image(
+    pixel_data: np.ndarray,
+    affine: np.ndarray,
+    file_path: str,
+    compression_level: int,
+) -> None:
+    # Content is compressed in memory, which releases the GIL
+    content = gzip.compress(
+        nibabel.Nifti1Image(pixel_data, affine).to_bytes(),
+        compresslevel = compression_level,
+    )
+    with open(file_path, 'wb') as file:
+        file.write(content)
\ No newline at end of file
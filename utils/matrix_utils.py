@@ -13,6 +13,8 @@ import numpy as np
 
 
 PRECISION = np.float32
+COMPACT_INTEGER_DATA_TYPE_SEQUENCE = (
+    np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32)
 
 
 def build_from_iterable(
@@ -25,6 +27,27 @@ def build_identity(length: int = 4) -> np.ndarray:
 def cast(matrix: np.ndarray, data_type: type = PRECISION) -> np.ndarray:
     return matrix if matrix.dtype == data_type else matrix.astype(data_type)
 
+def cast_compact(matrix: np.ndarray) -> np.ndarray:
+    """Casts to the smallest data type holding all values exactly.
+
+    Integer values are cast to the smallest integer type that
+    holds their range, and other values to PRECISION if no
+    value is changed by it.
+    """
+    if matrix.size == 0:
+        return cast(matrix, COMPACT_INTEGER_DATA_TYPE_SEQUENCE[0])
+    if np.issubdtype(matrix.dtype, np.integer) or np.array_equal(
+        matrix, np.round(matrix)):
+        minimum, maximum = np.min(matrix), np.max(matrix)
+        for data_type in COMPACT_INTEGER_DATA_TYPE_SEQUENCE:
+            data_type_info = np.iinfo(data_type)
+            if data_type_info.min <= minimum and maximum <= data_type_info.max:
+                return cast(matrix, data_type)
+    if np.array_equal(cast(matrix), matrix):
+        return cast(matrix)
+    else:
+        return matrix
+
 def norm_2_columnwise(matrix: np.ndarray) -> np.ndarray:
     return np.linalg.norm(matrix, axis=0)
 
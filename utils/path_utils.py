@@ -24,6 +24,13 @@ def extract_file_extension(file_path: str) -> str:
 def extract_file_name(file_path: str) -> str:
     return pathlib.Path(file_path).name
 
+def extract_modification_time(path: str) -> int:
+    """Returns the modification time in nanoseconds, or 0 if missing."""
+    try:
+        return pathlib.Path(path).stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
 def list_subdirectory(
     directory_path: str,
     require_absolute: bool = True,
@@ -0,0 +1,53 @@
+"""Utils for sharing memory.
+
+This module contains utility functions that facilitate
+sharing arrays between processes through shared memory
+without pickling them.
+
+Created by: Weixun Luo
+Date: 17/10/2026
+"""
+from __future__ import annotations
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from object import record
+
+
+def allocate(
+    shape: tuple[int, ...], data_type: type,
+) -> tuple[shared_memory.SharedMemory, record.SharedArray]:
+    shared_array = record.SharedArray(
+        name = '', shape = shape, data_type = np.dtype(data_type).str)
+    memory = shared_memory.SharedMemory(
+        create = True,
+        size = max(int(np.prod(shape)) * np.dtype(data_type).itemsize, 1),
+    )
+    shared_array['name'] = memory.name
+    return memory, shared_array
+
+def publish(
+    array: np.ndarray,
+) -> tuple[shared_memory.SharedMemory, record.SharedArray]:
+    memory, shared_array = allocate(array.shape, array.dtype)
+    np.copyto(build_array(memory, shared_array), array)
+    return memory, shared_array
+
+def attach(
+    shared_array: record.SharedArray,
+) -> tuple[shared_memory.SharedMemory, np.ndarray]:
+    memory = shared_memory.SharedMemory(name=shared_array['name'])
+    return memory, build_array(memory, shared_array)
+
+def build_array(
+    memory: shared_memory.SharedMemory, shared_array: record.SharedArray,
+) -> np.ndarray:
+    return np.ndarray(
+        shared_array['shape'], shared_array['data_type'], memory.buf)
+
+def release(memory: shared_memory.SharedMemory, is_owner: bool) -> None:
+    # Arrays built on the memory must be released before closing it
+    memory.close()
+    if is_owner:
+        memory.unlink()
@@ -93,6 +93,19 @@ def build_keyboard_event(
 def build_keyboard_listener(id: ID) -> dash_extensions.EventListener:
     return dash_extensions.EventListener(id=id, logging=False, n_events=0)
 
+def build_keyboard_release_listener(id: ID) -> dash_extensions.EventListener:
+    return dash_extensions.EventListener(
+        id = id,
+        events = [{'event': 'keyup', 'props': ['key']}],
+        logging = False,
+        n_events = 0,
+    )
+
+
+# ----- Interval -----
+def build_interval(id: ID, interval: int, is_disabled: bool = False) -> dcc.Interval:
+    return dcc.Interval(id, interval, disabled=is_disabled)
+
 
 # ----- Label -----
 def build_label(